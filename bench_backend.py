@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Benchmark time-to-first-token and total latency of the configured model backends.
+
+Usage: python bench_backend.py [--runs N] [--prompt TEXT] [--backend NAME ...]
+
+Backends default to MINICODER_BACKEND and MINICODER_FAST_BACKEND; pass --backend to
+benchmark presets directly, e.g. --backend openai --backend llamacpp. Presets named this way
+ignore MINICODER_* overrides; use NAME:PREFIX (e.g. --backend custom:BENCH_) to read
+overrides from PREFIX* variables instead.
+"""
+
+import argparse
+import statistics
+import time
+
+from src.core.backends import create_backend
+from src.core.config import backend, fast_backend, MAX_COMPLETION_TOKENS
+
+def time_request(model_backend, prompt: str):
+    """Return (seconds to first token, total seconds, characters received) for one streamed request."""
+    start = time.perf_counter()
+    first_token = None
+    received = 0
+    with model_backend.slot():
+        stream = model_backend.client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            **model_backend.request_options(MAX_COMPLETION_TOKENS),
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                received += len(chunk.choices[0].delta.content)
+    total = time.perf_counter() - start
+    return first_token if first_token is not None else total, total, received
+
+def parse_backend(spec: str):
+    """Build 'NAME' from its preset alone, or 'NAME:PREFIX' with overrides from PREFIX* variables."""
+    name, _, env_prefix = spec.partition(":")
+    return create_backend(name, env_prefix=env_prefix or None)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prompt", default="Write a Python function that checks whether a string is a palindrome.")
+    parser.add_argument("--backend", action="append", help="Backend preset to benchmark, as NAME or NAME:ENV_PREFIX (repeatable)")
+    args = parser.parse_args()
+
+    backends = [parse_backend(spec) for spec in args.backend] if args.backend else [backend]
+    if not args.backend and fast_backend is not None:
+        backends.append(fast_backend)
+
+    for model_backend in backends:
+        print(f"\n{model_backend}")
+        first_tokens, totals, chars = [], [], 0
+        for _ in range(args.runs):
+            try:
+                first_token, total, received = time_request(model_backend, args.prompt)
+            except Exception as e:
+                print(f"  request failed: {e}")
+                break
+            first_tokens.append(first_token)
+            totals.append(total)
+            chars += received
+        if totals:
+            print(f"  time to first token: p50 {statistics.median(first_tokens) * 1000:.0f} ms, "
+                  f"max {max(first_tokens) * 1000:.0f} ms")
+            print(f"  total latency:       p50 {statistics.median(totals) * 1000:.0f} ms, "
+                  f"max {max(totals) * 1000:.0f} ms")
+            print(f"  throughput:          {chars / sum(totals):.0f} chars/s over {len(totals)} run(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Benchmark the BM25 retrieval index: full build, reload, no-op and one-file refresh, query latency.
+
+Usage: python bench_retrieval.py [path/to/repo] [queries...]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from src.utils.retrieval import RetrievalIndex, INDEX_DIR
+
+DEFAULT_QUERIES = [
+    "where is the api request handled",
+    "normalize path security check",
+    "parse command line arguments",
+    "read configuration from environment",
+    "write file to disk",
+]
+
+def main():
+    repo_path = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else ".")
+    queries = sys.argv[2:] or DEFAULT_QUERIES
+
+    # Work on a copy of the index location so the benchmark never reuses a warm index
+    index_dir = os.path.join(repo_path, INDEX_DIR)
+    backup_dir = None
+    if os.path.isdir(index_dir):
+        backup_dir = tempfile.mkdtemp()
+        shutil.move(index_dir, os.path.join(backup_dir, INDEX_DIR))
+
+    try:
+        index = RetrievalIndex(repo_path)
+        start = time.perf_counter()
+        indexed = index.refresh()
+        build_time = time.perf_counter() - start
+        chunks = sum(len(entry["chunks"]) for entry in index.files.values())
+        print(f"Indexed {indexed} files / {chunks} chunks in {build_time * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        reloaded = RetrievalIndex(repo_path)
+        changed = reloaded.refresh()
+        refresh_time = time.perf_counter() - start
+        print(f"Reload + incremental refresh ({changed} changed) in {refresh_time * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        changed = reloaded.refresh()
+        print(f"No-op refresh ({changed} changed) in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        # Touch one indexed file, as an agent edit would
+        touched = next((path for path, entry in reloaded.files.items() if entry["chunks"]), None)
+        if touched:
+            stat = os.stat(touched)
+            os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            start = time.perf_counter()
+            changed = reloaded.refresh()
+            print(f"One-file refresh ({changed} changed) in {(time.perf_counter() - start) * 1000:.1f} ms")
+            os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        rounds = 20
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for query in queries:
+                reloaded.search(query)
+        per_query = (time.perf_counter() - start) / (rounds * len(queries))
+        print(f"Query latency: {per_query * 1000:.2f} ms avg over {rounds * len(queries)} queries")
+
+        for query in queries:
+            hits = reloaded.search(query, top_k=3)
+            print(f"\n{query!r}")
+            for score, file_path, first, last in hits:
+                print(f"  {score:6.2f}  {os.path.relpath(file_path, repo_path)}:{first + 1}-{last}")
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+        if backup_dir:
+            shutil.move(os.path.join(backup_dir, INDEX_DIR), index_dir)
+            shutil.rmtree(backup_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,21 @@
 import os
-from src.core.config import console, prompt_session
+from src.core.config import console, prompt_session, fast_backend
 from src.core.models import SYSTEM_PROMPT
+from src.core.context import Conversation
 from src.utils.file_operations import (
     normalize_path, read_local_file, add_directory_to_conversation
 )
+from src.utils.repo_map import add_repo_map_to_conversation
 from src.api.handler import stream_openai_response
+from src.utils.prefetch import prefetcher
+from src.utils.retrieval import refresh_workspace_index
+from src.tools.definitions import registry
 from src.ui.console import display_welcome_message, display_exit_message, display_session_end
 
 # --------------------------------------------------------------------------------
 # Conversation state
 # --------------------------------------------------------------------------------
-conversation_history = [
-    {"role": "system", "content": SYSTEM_PROMPT}
-]
+conversation_history = Conversation(SYSTEM_PROMPT)
 
 # --------------------------------------------------------------------------------
 # Helper functions
@@ -30,16 +33,37 @@ def try_handle_add_command(user_input: str) -> bool:
             else:
                 # Handle a single file as before
                 content = read_local_file(normalized_path)
-                conversation_history.append({
-                    "role": "system",
-                    "content": f"Content of file '{normalized_path}':\n\n{content}"
-                })
+                conversation_history.pin(f"Content of file '{normalized_path}':\n\n{content}")
                 console.print(f"[bold blue]✓[/bold blue] Added file '[bright_cyan]{normalized_path}[/bright_cyan]' to conversation.\n")
         except OSError as e:
             console.print(f"[bold red]✗[/bold red] Could not add path '[bright_cyan]{path_to_add}[/bright_cyan]': {e}\n")
         return True
     return False
 
+def try_handle_map_command(user_input: str) -> bool:
+    stripped = user_input.strip()
+    if stripped.lower() == "/map" or stripped.lower().startswith("/map "):
+        path_to_map = stripped[len("/map"):].strip() or "."
+        try:
+            normalized_path = normalize_path(path_to_map)
+            if not os.path.isdir(normalized_path):
+                raise NotADirectoryError(f"'{normalized_path}' is not a directory")
+            add_repo_map_to_conversation(normalized_path, conversation_history)
+        except (OSError, ValueError) as e:
+            console.print(f"[bold red]✗[/bold red] Could not map path '[bright_cyan]{path_to_map}[/bright_cyan]': {e}\n")
+        return True
+    return False
+
+def split_fast_prefix(user_input: str):
+    """Return (message, backend) for '/fast <message>', which runs the turn on the fast backend."""
+    prefix = "/fast "
+    if not user_input.lower().startswith(prefix):
+        return user_input, None
+    if fast_backend is None:
+        console.print("[bold #f59e0b]⚠ No fast backend configured (set MINICODER_FAST_BACKEND); using the default backend[/bold #f59e0b]")
+        return user_input[len(prefix):].strip(), None
+    return user_input[len(prefix):].strip(), fast_backend
+
 # --------------------------------------------------------------------------------
 # Main interactive loop
 # --------------------------------------------------------------------------------
@@ -48,6 +72,13 @@ def main():
     # Display welcome message
     display_welcome_message()
 
+    # Build the retrieval index and the prefetch file-name map in the background
+    refresh_workspace_index()
+    prefetcher.scan()
+
+    # Start reading files mentioned in the input while the user is still typing
+    prompt_session.default_buffer.on_text_changed += lambda buffer: prefetcher.warm(buffer.text)
+
     while True:
         try:
             user_input = prompt_session.prompt("💜 You> ").strip()
@@ -65,11 +96,16 @@ def main():
         if try_handle_add_command(user_input):
             continue
 
-        response_data = stream_openai_response(user_input, conversation_history)
+        if try_handle_map_command(user_input):
+            continue
+
+        user_input, model_backend = split_fast_prefix(user_input)
+        response_data = stream_openai_response(user_input, conversation_history, model_backend)
         
         if response_data.get("error"):
             console.print(f"[bold #ef4444]❌ Error: {response_data['error']}[/bold #ef4444]")
 
+    registry.shutdown()
     display_session_end()
 
 if __name__ == "__main__":
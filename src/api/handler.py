@@ -1,11 +1,14 @@
 import json
 import time
-from src.core.config import client, console
-from src.tools.definitions import tools
-from src.utils.file_operations import (
-    read_local_file, normalize_path, create_file, 
-    apply_diff_edit, ensure_file_in_context
+from src.core.config import (
+    backend, console, MAX_COMPLETION_TOKENS, MAX_CONTINUATIONS, CHUNKED_WRITE_THRESHOLD,
+    AGENT_MAX_STEPS, AGENT_MAX_TOKENS, AGENT_MAX_SECONDS
 )
+from src.core.context import PrefixCacheEstimator
+from src.tools.definitions import tools, registry
+from src.utils.file_operations import estimate_tokens
+from src.utils.retrieval import retrieve_relevant_snippets, refresh_workspace_index
+from src.utils.prefetch import prefetcher
 
 # --------------------------------------------------------------------------------
 # Tool Execution
@@ -24,254 +27,274 @@ def execute_function_call_dict(tool_call_dict, conversation_history) -> str:
         try:
             arguments = json.loads(arguments_str)
         except json.JSONDecodeError as e:
+            if function_name in ("create_file", "create_multiple_files"):
+                # Arguments still truncated after continuation: ask for a chunked write instead
+                return (f"Error parsing function arguments: {str(e)}. The output was likely cut off by the token limit. "
+                        f"Write the file in chunks of at most {CHUNKED_WRITE_THRESHOLD} characters: call create_file "
+                        "with the first chunk, then create_file with mode 'append' for each following chunk. "
+                        "Set partial to true on every chunk except the last.")
             return f"Error parsing function arguments: {str(e)}"
         
-        if function_name == "read_file":
-            file_path = arguments["file_path"]
-            normalized_path = normalize_path(file_path)
-            content = read_local_file(normalized_path)
-            return f"Content of file '{normalized_path}':\n\n{content}"
-            
-        elif function_name == "read_multiple_files":
-            file_paths = arguments["file_paths"]
-            results = []
-            for file_path in file_paths:
-                try:
-                    normalized_path = normalize_path(file_path)
-                    content = read_local_file(normalized_path)
-                    results.append(f"Content of file '{normalized_path}':\n\n{content}")
-                except OSError as e:
-                    results.append(f"Error reading '{file_path}': {e}")
-            return "\n\n" + "="*50 + "\n\n".join(results)
-            
-        elif function_name == "create_file":
-            file_path = arguments["file_path"]
-            content = arguments["content"]
-            create_file(file_path, content)
-            return f"Successfully created file '{file_path}'"
-            
-        elif function_name == "create_multiple_files":
-            files = arguments["files"]
-            created_files = []
-            for file_info in files:
-                create_file(file_info["path"], file_info["content"])
-                created_files.append(file_info["path"])
-            return f"Successfully created {len(created_files)} files: {', '.join(created_files)}"
-            
-        elif function_name == "edit_file":
-            file_path = arguments["file_path"]
-            original_snippet = arguments["original_snippet"]
-            new_snippet = arguments["new_snippet"]
-            
-            # Ensure file is in context first
-            if not ensure_file_in_context(file_path, conversation_history):
-                return f"Error: Could not read file '{file_path}' for editing"
-            
-            # Try to apply the edit
-            try:
-                apply_diff_edit(file_path, original_snippet, new_snippet)
-                return f"Successfully edited file '{file_path}'"
-            except Exception as e:
-                # Provide more detailed error information
-                error_details = f"Error editing file '{file_path}': {str(e)}"
-                console.print(f"[bold red]✗[/bold red] {error_details}")
-                
-                # Show the actual file content for debugging
-                try:
-                    current_content = read_local_file(file_path)
-                    console.print("\n[bold blue]Current file content:[/bold blue]")
-                    console.print(Panel(current_content, title="Current Content", border_style="yellow", title_align="left"))
-                except Exception as read_error:
-                    console.print(f"[dim]Could not read file for debugging: {read_error}[/dim]")
-                
-                return error_details
-            
-        else:
-            return f"Unknown function: {function_name}"
+        return registry.dispatch(function_name, arguments, conversation_history)
             
     except Exception as e:
         function_name = tool_call_dict.get("function", {}).get("name", "unknown")
         return f"Error executing {function_name}: {str(e)}"
 
-def trim_conversation_history(conversation_history):
-    """Trim conversation history to prevent token limit issues while preserving tool call sequences"""
-    if len(conversation_history) <= 20:  # Don't trim if conversation is still small
-        return
-        
-    # Always keep the system prompt
-    system_msgs = [msg for msg in conversation_history if msg["role"] == "system"]
-    other_msgs = [msg for msg in conversation_history if msg["role"] != "system"]
-    
-    # Keep only the last 15 messages to prevent token overflow
-    if len(other_msgs) > 15:
-        other_msgs = other_msgs[-15:]
-    
-    # Rebuild conversation history
-    conversation_history.clear()
-    conversation_history.extend(system_msgs + other_msgs)
-
-def stream_openai_response(user_message: str, conversation_history):
-    # Add the user message to conversation history
-    conversation_history.append({"role": "user", "content": user_message})
-    
-    # Trim conversation history if it's getting too long
-    trim_conversation_history(conversation_history)
+# --------------------------------------------------------------------------------
+# Streaming
+# --------------------------------------------------------------------------------
 
-    try:
-        stream = client.chat.completions.create(
-            model="gpt-4o",
-            messages=conversation_history,
-            tools=tools,
-            max_completion_tokens=2000,
-            stream=True
-        )
+cache_estimator = PrefixCacheEstimator()
 
-        console.print("\n[bold #9333ea]✨ Thinking...[/bold #9333ea]")
-        reasoning_started = False
-        final_content = ""
-        tool_calls = []
+def stream_completion(messages, use_tools: bool = True, echo: bool = True, model_backend=None, observe_cache: bool = True):
+    """Stream one completion and return (content, tool_calls, finish_reason), printing reasoning and content.
+
+    Continuation requests pass observe_cache=False: their tail differs from the main loop's requests,
+    so comparing against them would understate how much of the next real request is cached.
+    """
+    model_backend = model_backend or backend
+    request = {
+        "messages": messages,
+        "stream": True,
+        **model_backend.request_options(MAX_COMPLETION_TOKENS),
+    }
+    if use_tools and model_backend.supports_tools:
+        request["tools"] = tools
+
+    if observe_cache:
+        unchanged, total = cache_estimator.observe(messages, request.get("tools"))
+        if unchanged:
+            console.print(f"[dim]🧊 Prompt cache: {unchanged * 100 // total}% of the request prefix unchanged ({unchanged:,}/{total:,} bytes)[/dim]")
+
+    with model_backend.slot():
+        return _collect_stream(model_backend.client.chat.completions.create(**request), model_backend, echo)
 
-        for chunk in stream:
-            # Handle reasoning content if available
-            if hasattr(chunk.choices[0].delta, 'reasoning_content') and chunk.choices[0].delta.reasoning_content:
+def _collect_stream(stream, model_backend, echo: bool):
+    reasoning_started = False
+    content = ""
+    tool_calls = []
+    finish_reason = None
+
+    for chunk in stream:
+        if getattr(chunk, "usage", None) and echo:
+            usage = chunk.usage
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = getattr(details, "cached_tokens", None) or 0
+            console.print(f"[dim]📊 {usage.prompt_tokens:,} prompt tokens ({cached:,} cached), {usage.completion_tokens:,} completion tokens[/dim]")
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+        delta = choice.delta
+        # Handle reasoning content if the backend streams it
+        if model_backend.supports_reasoning and getattr(delta, 'reasoning_content', None):
+            if echo:
                 if not reasoning_started:
                     console.print("\n[bold #c084fc]💭 Reasoning:[/bold #c084fc]")
                     reasoning_started = True
-                console.print(chunk.choices[0].delta.reasoning_content, end="")
-            elif chunk.choices[0].delta.content:
-                if reasoning_started:
-                    console.print("\n")  # Add spacing after reasoning
-                    console.print("\n[bold #f472b6]🤖 Assistant>[/bold #f472b6] ", end="")
-                    reasoning_started = False
-                final_content += chunk.choices[0].delta.content
-                console.print(chunk.choices[0].delta.content, end="")
-            elif chunk.choices[0].delta.tool_calls:
-                # Handle tool calls
-                for tool_call_delta in chunk.choices[0].delta.tool_calls:
-                    if tool_call_delta.index is not None:
-                        # Ensure we have enough tool_calls
-                        while len(tool_calls) <= tool_call_delta.index:
-                            tool_calls.append({
-                                "id": "",
-                                "type": "function",
-                                "function": {"name": "", "arguments": ""}
-                            })
-                        
-                        if tool_call_delta.id:
-                            tool_calls[tool_call_delta.index]["id"] = tool_call_delta.id
-                        if tool_call_delta.function:
-                            if tool_call_delta.function.name:
-                                tool_calls[tool_call_delta.index]["function"]["name"] += tool_call_delta.function.name
-                            if tool_call_delta.function.arguments:
-                                tool_calls[tool_call_delta.index]["function"]["arguments"] += tool_call_delta.function.arguments
-
-        console.print()  # New line after streaming
-
-        # Store the assistant's response in conversation history
-        assistant_message = {
-            "role": "assistant",
-            "content": final_content if final_content else None
-        }
-        
-        if tool_calls:
-            # Convert our tool_calls format to the expected format
-            formatted_tool_calls = []
-            for i, tc in enumerate(tool_calls):
-                if tc["function"]["name"]:  # Only add if we have a function name
-                    # Ensure we have a valid tool call ID
-                    tool_id = tc["id"] if tc["id"] else f"call_{i}_{int(time.time() * 1000)}"
-                    
-                    formatted_tool_calls.append({
-                        "id": tool_id,
-                        "type": "function",
-                        "function": {
-                            "name": tc["function"]["name"],
-                            "arguments": tc["function"]["arguments"]
-                        }
-                    })
-            
-            if formatted_tool_calls:
-                # Important: When there are tool calls, content should be None or empty
-                if not final_content:
-                    assistant_message["content"] = None
-                    
-                assistant_message["tool_calls"] = formatted_tool_calls
-                conversation_history.append(assistant_message)
-                
-                # Execute tool calls and add results immediately
-                console.print(f"\n[bold #9333ea]⚡ Executing {len(formatted_tool_calls)} function call(s)...[/bold #9333ea]")
-                for i, tool_call in enumerate(formatted_tool_calls):
-                    console.print(f"[#f472b6]→ {tool_call['function']['name']}[/#f472b6]")
-                    
-                    try:
-                        result = execute_function_call_dict(tool_call, conversation_history)
-                        
-                        # Check if the result indicates an error
-                        if "Error" in result or "error" in result.lower():
-                            console.print(f"[bold #ef4444]✗[/bold #ef4444] {result}")
-                        else:
-                            console.print(f"[bold #10b981]✓[/bold #10b981] {result}")
-                        
-                        # Add tool result to conversation immediately
-                        tool_response = {
-                            "role": "tool",
-                            "tool_call_id": tool_call["id"],
-                            "content": result
-                        }
-                        conversation_history.append(tool_response)
-                    except Exception as e:
-                        error_msg = f"Error executing {tool_call['function']['name']}: {e}"
-                        console.print(f"[bold #ef4444]✗[/bold #ef4444] {error_msg}")
-                        # Still need to add a tool response even on error
-                        conversation_history.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call["id"],
-                            "content": f"Error: {str(e)}"
-                        })
-                
-                # Get follow-up response after tool execution
-                console.print("\n[bold #9333ea]🔄 Processing results...[/bold #9333ea]")
-                
-                follow_up_stream = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=conversation_history,
-                    tools=tools,
-                    max_completion_tokens=2000,
-                    stream=True
-                )
-                
-                follow_up_content = ""
+                console.print(delta.reasoning_content, end="")
+        elif delta.content:
+            if reasoning_started:
+                console.print("\n")  # Add spacing after reasoning
+                console.print("\n[bold #f472b6]🤖 Assistant>[/bold #f472b6] ", end="")
                 reasoning_started = False
-                
-                for chunk in follow_up_stream:
-                    # Handle reasoning content if available
-                    if hasattr(chunk.choices[0].delta, 'reasoning_content') and chunk.choices[0].delta.reasoning_content:
-                        if not reasoning_started:
-                            console.print("\n[bold #c084fc]💭 Reasoning:[/bold #c084fc]")
-                            reasoning_started = True
-                        console.print(chunk.choices[0].delta.reasoning_content, end="")
-                    elif chunk.choices[0].delta.content:
-                        if reasoning_started:
-                            console.print("\n")
-                            console.print("\n[bold #f472b6]🤖 Assistant>[/bold #f472b6] ", end="")
-                            reasoning_started = False
-                        follow_up_content += chunk.choices[0].delta.content
-                        console.print(chunk.choices[0].delta.content, end="")
-                
-                console.print()
-                
-                # Store follow-up response
-                conversation_history.append({
-                    "role": "assistant",
-                    "content": follow_up_content
-                })
+            content += delta.content
+            if echo:
+                console.print(delta.content, end="")
+        elif delta.tool_calls:
+            # Handle tool calls
+            for tool_call_delta in delta.tool_calls:
+                if tool_call_delta.index is not None:
+                    # Ensure we have enough tool_calls
+                    while len(tool_calls) <= tool_call_delta.index:
+                        tool_calls.append({
+                            "id": "",
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""}
+                        })
+
+                    if tool_call_delta.id:
+                        tool_calls[tool_call_delta.index]["id"] = tool_call_delta.id
+                    if tool_call_delta.function:
+                        if tool_call_delta.function.name:
+                            tool_calls[tool_call_delta.index]["function"]["name"] += tool_call_delta.function.name
+                        if tool_call_delta.function.arguments:
+                            tool_calls[tool_call_delta.index]["function"]["arguments"] += tool_call_delta.function.arguments
+
+    return content, tool_calls, finish_reason
+
+def _strip_code_fence(text: str) -> str:
+    text = text.strip("\n")
+    if text.startswith("```") and text.rstrip().endswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rstrip()[:-3].rstrip("\n")
+    return text
+
+def request_completion(messages, model_backend=None):
+    """Stream a completion, issuing continuation requests while the output is cut off by the token limit.
+
+    Truncated text is continued from the partial answer; a truncated tool call is continued by asking
+    for the rest of its JSON arguments, which are stitched onto the partial arguments.
+    Returns (content, tool_calls, estimated tokens spent on continuation requests).
+    """
+    content, tool_calls, finish_reason = stream_completion(messages, model_backend=model_backend)
+    continuations = 0
+    continuation_tokens = 0
+
+    while finish_reason == "length" and continuations < MAX_CONTINUATIONS:
+        continuations += 1
+        console.print(f"\n[dim]↪ Output hit the {MAX_COMPLETION_TOKENS}-token limit, continuing ({continuations}/{MAX_CONTINUATIONS})...[/dim]")
+
+        if tool_calls:
+            # Tool calls stream after any text, so the cut-off is inside the last call's arguments
+            function = tool_calls[-1]["function"]
+            continuation_messages = messages + [
+                {"role": "assistant", "content": function["arguments"]},
+                {"role": "user", "content": (
+                    f"The JSON arguments above for your call to {function['name']} were cut off by the output token limit. "
+                    "Reply with ONLY the remaining characters of that JSON, continuing exactly where it stopped. "
+                    "Do not repeat anything and do not use code fences."
+                )},
+            ]
+            rest, _, finish_reason = stream_completion(
+                continuation_messages, use_tools=False, echo=False, model_backend=model_backend, observe_cache=False
+            )
+            function["arguments"] += _strip_code_fence(rest)
+            continuation_tokens += estimate_tokens(json.dumps(continuation_messages) + rest)
         else:
-            # No tool calls, just store the regular response
-            conversation_history.append(assistant_message)
+            continuation_messages = messages + [
+                {"role": "assistant", "content": content},
+                {"role": "user", "content": "Your answer above was cut off by the output token limit. Continue exactly where it stopped, without repeating anything."},
+            ]
+            rest, more_tool_calls, finish_reason = stream_completion(
+                continuation_messages, model_backend=model_backend, observe_cache=False
+            )
+            content += rest
+            tool_calls.extend(more_tool_calls)
+            continuation_tokens += estimate_tokens(json.dumps(continuation_messages) + rest + json.dumps(more_tool_calls))
+
+    if finish_reason == "length":
+        console.print(f"\n[bold #f59e0b]⚠ Output still truncated after {MAX_CONTINUATIONS} continuation(s)[/bold #f59e0b]")
+    return content, tool_calls, continuation_tokens
+
+def format_tool_calls(tool_calls):
+    """Drop calls without a function name and make sure every call has an ID."""
+    formatted_tool_calls = []
+    for i, tc in enumerate(tool_calls):
+        if tc["function"]["name"]:  # Only add if we have a function name
+            # Ensure we have a valid tool call ID
+            tool_id = tc["id"] if tc["id"] else f"call_{i}_{int(time.time() * 1000)}"
+
+            formatted_tool_calls.append({
+                "id": tool_id,
+                "type": "function",
+                "function": {
+                    "name": tc["function"]["name"],
+                    "arguments": tc["function"]["arguments"]
+                }
+            })
+    return formatted_tool_calls
+
+def execute_tool_calls(formatted_tool_calls, conversation_history):
+    """Run each tool call and append its result to the conversation."""
+    console.print(f"\n[bold #9333ea]⚡ Executing {len(formatted_tool_calls)} function call(s)...[/bold #9333ea]")
+    for tool_call in formatted_tool_calls:
+        console.print(f"[#f472b6]→ {tool_call['function']['name']}[/#f472b6]")
+
+        try:
+            result = execute_function_call_dict(tool_call, conversation_history)
+
+            # Check if the result indicates an error
+            if "Error" in result or "error" in result.lower():
+                console.print(f"[bold #ef4444]✗[/bold #ef4444] {result}")
+            else:
+                console.print(f"[bold #10b981]✓[/bold #10b981] {result}")
+
+            # Add tool result to conversation immediately
+            conversation_history.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": result
+            })
+        except Exception as e:
+            error_msg = f"Error executing {tool_call['function']['name']}: {e}"
+            console.print(f"[bold #ef4444]✗[/bold #ef4444] {error_msg}")
+            # Still need to add a tool response even on error
+            conversation_history.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": f"Error: {str(e)}"
+            })
+
+    # Context pinned while the tools ran goes after all of their results
+    conversation_history.flush_pins()
+
+def stream_openai_response(user_message: str, conversation_history, model_backend=None):
+    # Attach files mentioned in the message, then workspace snippets relevant to it
+    prefetched, prefetched_paths = prefetcher.collect(user_message, conversation_history)
+    snippets = retrieve_relevant_snippets(user_message, conversation_history, skip_paths=prefetched_paths)
+    user_message = "\n\n".join(part for part in (user_message, prefetched, snippets) if part)
+
+    # Add the user message to conversation history
+    conversation_history.append({"role": "user", "content": user_message})
+
+    try:
+        console.print("\n[bold #9333ea]✨ Thinking...[/bold #9333ea]")
+        started = time.monotonic()
+        steps = 0
+        tokens_used = 0
+        stop_reason = None
+
+        # Agent loop: keep going while the model calls tools, within the step/token/time budget
+        while True:
+            steps += 1
+            # Compact the turn log if it's getting too long (rare, so the cached prefix stays stable)
+            conversation_history.compact()
+            tokens_used += estimate_tokens(json.dumps(conversation_history))
+            final_content, tool_calls, continuation_tokens = request_completion(conversation_history, model_backend)
+            tokens_used += continuation_tokens
+            console.print()  # New line after streaming
+
+            formatted_tool_calls = format_tool_calls(tool_calls)
+            tokens_used += estimate_tokens(final_content + json.dumps(formatted_tool_calls))
+            if not formatted_tool_calls:
+                # Terminal answer: no more tools to run
+                conversation_history.append({"role": "assistant", "content": final_content})
+                break
+
+            # Important: When there are tool calls, content should be None or empty
+            conversation_history.append({
+                "role": "assistant",
+                "content": final_content if final_content else None,
+                "tool_calls": formatted_tool_calls
+            })
+            execute_tool_calls(formatted_tool_calls, conversation_history)
+
+            elapsed = time.monotonic() - started
+            if steps >= AGENT_MAX_STEPS:
+                stop_reason = f"step limit ({AGENT_MAX_STEPS})"
+            elif tokens_used >= AGENT_MAX_TOKENS:
+                stop_reason = f"token budget (~{AGENT_MAX_TOKENS:,})"
+            elif elapsed >= AGENT_MAX_SECONDS:
+                stop_reason = f"time budget ({AGENT_MAX_SECONDS:g}s)"
+            if stop_reason:
+                break
+
+            console.print("\n[bold #9333ea]🔄 Processing results...[/bold #9333ea]")
 
-        return {"success": True}
+        elapsed = time.monotonic() - started
+        if stop_reason:
+            console.print(f"[bold #f59e0b]⚠ Stopped at the {stop_reason}. Say 'continue' to keep going.[/bold #f59e0b]")
+        console.print(f"[#6b7280]{steps} step(s), ~{tokens_used:,} tokens, {elapsed:.1f}s[/#6b7280]")
+        return {"success": True, "steps": steps, "stop_reason": stop_reason}
 
     except Exception as e:
-        error_msg = f"OpenAI API error: {str(e)}"
+        error_msg = f"API error ({(model_backend or backend).name}): {str(e)}"
         console.print(f"\n[bold #ef4444]❌ {error_msg}[/bold #ef4444]")
         return {"error": error_msg}
+    finally:
+        # Pick up files the turn created or changed while the user types the next message
+        refresh_workspace_index()
+        prefetcher.scan()
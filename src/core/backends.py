@@ -0,0 +1,100 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from openai import OpenAI
+
+# --------------------------------------------------------------------------------
+# Model Backends
+# --------------------------------------------------------------------------------
+
+# Defaults for known OpenAI-compatible servers; any field can be overridden from the environment
+BACKEND_PRESETS = {
+    "openai": {
+        "base_url": None, "model": "gpt-4o", "api_key_env": "OPENAI_API_KEY",
+        "tools": True, "reasoning": False, "stream_usage": True, "concurrency": 8,
+        "max_tokens_param": "max_completion_tokens",
+    },
+    "llamacpp": {
+        "base_url": "http://localhost:8080/v1", "model": "local",
+        "tools": True, "reasoning": True, "stream_usage": False, "concurrency": 1,
+        "max_tokens_param": "max_tokens",
+    },
+    "vllm": {
+        "base_url": "http://localhost:8000/v1", "model": "local",
+        "tools": True, "reasoning": True, "stream_usage": True, "concurrency": 4,
+        "max_tokens_param": "max_tokens",
+    },
+    "ollama": {
+        "base_url": "http://localhost:11434/v1", "model": "qwen2.5-coder",
+        "tools": True, "reasoning": False, "stream_usage": False, "concurrency": 1,
+        "max_tokens_param": "max_tokens",
+    },
+}
+
+def _env_flag(name, default: bool) -> bool:
+    value = os.getenv(name) if name else None
+    return default if value is None else value.strip().lower() in ("1", "true", "yes", "on")
+
+class Backend:
+    """An OpenAI-compatible chat endpoint with its capability flags and a concurrency limit."""
+
+    def __init__(self, name: str, base_url, model: str, api_key: str, supports_tools: bool = True,
+                 supports_reasoning: bool = False, stream_usage: bool = False, max_concurrency: int = 1,
+                 max_tokens_param: str = "max_completion_tokens"):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.supports_tools = supports_tools
+        self.supports_reasoning = supports_reasoning
+        self.stream_usage = stream_usage
+        self.max_tokens_param = max_tokens_param
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the backend's concurrent request slots."""
+        with self._slots:
+            yield
+
+    def request_options(self, max_tokens: int) -> dict:
+        """Keyword arguments for chat.completions.create that depend on this backend."""
+        options = {"model": self.model, self.max_tokens_param: max_tokens}
+        if self.stream_usage:
+            options["stream_options"] = {"include_usage": True}
+        return options
+
+    def __repr__(self):
+        return f"Backend({self.name!r}, model={self.model!r}, base_url={self.base_url!r})"
+
+def create_backend(name: str, env_prefix: Optional[str] = "MINICODER_") -> Backend:
+    """Build a backend from a preset name (or 'custom'), overridden by <env_prefix>* variables.
+
+    With env_prefix=None the preset is used as is (only its API key is read from the environment).
+    """
+    preset = BACKEND_PRESETS.get(name, BACKEND_PRESETS["vllm"] if name == "custom" else None)
+    if preset is None:
+        raise ValueError(f"Unknown backend '{name}' (known: {', '.join(BACKEND_PRESETS)}, custom)")
+
+    def setting(key: str, default):
+        return os.getenv(f"{env_prefix}{key}", default) if env_prefix else default
+
+    def variable(key: str):
+        return f"{env_prefix}{key}" if env_prefix else None
+
+    api_key = setting("API_KEY", None)
+    if api_key is None and preset.get("api_key_env"):
+        api_key = os.getenv(preset["api_key_env"])
+    return Backend(
+        name=name,
+        base_url=setting("BASE_URL", preset["base_url"]),
+        model=setting("MODEL", preset["model"]),
+        # Local servers ignore the key, but the client requires one
+        api_key=api_key or "not-needed",
+        supports_tools=_env_flag(variable("TOOLS"), preset["tools"]),
+        supports_reasoning=_env_flag(variable("REASONING"), preset["reasoning"]),
+        stream_usage=_env_flag(variable("STREAM_USAGE"), preset["stream_usage"]),
+        max_concurrency=int(setting("CONCURRENCY", preset["concurrency"])),
+        max_tokens_param=setting("MAX_TOKENS_PARAM", preset["max_tokens_param"]),
+    )
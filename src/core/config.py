@@ -1,10 +1,10 @@
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
 from rich.console import Console
 from rich.theme import Theme
 from prompt_toolkit import PromptSession
 from prompt_toolkit.styles import Style as PromptStyle
+from src.core.backends import create_backend
 
 # Load environment variables
 load_dotenv()
@@ -43,6 +43,69 @@ prompt_session = PromptSession(
     })
 )
 
-# Configure OpenAI client
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),)
+# Configure the model backend (OpenAI by default, or any OpenAI-compatible server)
+backend = create_backend(os.getenv("MINICODER_BACKEND", "openai"))
+client = backend.client
+# Optional second backend for cheap, latency-sensitive turns (e.g. a local CPU model)
+fast_backend = (
+    create_backend(os.getenv("MINICODER_FAST_BACKEND"), env_prefix="MINICODER_FAST_")
+    if os.getenv("MINICODER_FAST_BACKEND") else None
+)
+
+# Completion limits: outputs cut off at MAX_COMPLETION_TOKENS are continued up to MAX_CONTINUATIONS times
+MAX_COMPLETION_TOKENS = int(os.getenv("MINICODER_MAX_COMPLETION_TOKENS", "2000"))
+MAX_CONTINUATIONS = int(os.getenv("MINICODER_MAX_CONTINUATIONS", "3"))
+# File contents longer than this (in characters) should be written in chunks with mode="append"
+CHUNKED_WRITE_THRESHOLD = MAX_COMPLETION_TOKENS * 3
+
+# Agent loop budget per user turn (the loop ends earlier once the model answers without tool calls)
+AGENT_MAX_STEPS = int(os.getenv("MINICODER_AGENT_MAX_STEPS", "10"))
+AGENT_MAX_TOKENS = int(os.getenv("MINICODER_AGENT_MAX_TOKENS", "200000"))
+AGENT_MAX_SECONDS = float(os.getenv("MINICODER_AGENT_MAX_SECONDS", "300"))
+
+# Turn log compaction: once the turns (not pinned context) pass CONTEXT_TRIM_TOKENS estimated tokens,
+# old turns are dropped down to about a third of that
+CONTEXT_TRIM_TOKENS = int(os.getenv("MINICODER_CONTEXT_TRIM_TOKENS", "60000"))
+
+# Tool execution limits (isolated tools run in a worker process pool)
+TOOL_TIMEOUT = float(os.getenv("MINICODER_TOOL_TIMEOUT", "60"))
+TOOL_PROCESS_WORKERS = int(os.getenv("MINICODER_TOOL_WORKERS", "2"))
+TOOL_MEMORY_LIMIT_MB = int(os.getenv("MINICODER_TOOL_MEMORY_MB", "1024"))
+
+# run_command tool: allowlisted programs run without a shell inside the workspace.
+# ALLOWED_COMMANDS (read-only tools and test runners) run unattended; CONFIRM_COMMANDS can run
+# arbitrary code or change files and only run after the user confirms each command
+# realpath, to match normalize_path (which resolves symlinks) in the workspace check
+WORKSPACE_ROOT = os.path.realpath(os.getenv("MINICODER_WORKSPACE", "."))
+ALLOWED_COMMANDS = set(os.getenv(
+    "MINICODER_ALLOWED_COMMANDS",
+    "pytest,flake8,pylint,mypy,git,ls,cat,grep,head,tail,wc"
+).split(","))
+CONFIRM_COMMANDS = set(os.getenv(
+    "MINICODER_CONFIRM_COMMANDS",
+    "python,python3,ruff,black,isort,tox,nox,make,npm,npx,node,yarn,pnpm,go,cargo"
+).split(","))
+# git subcommands that only read the repository; any other git command needs confirmation
+READ_ONLY_GIT_SUBCOMMANDS = {
+    "status", "diff", "log", "show", "blame", "grep", "ls-files", "rev-parse", "describe", "shortlog",
+}
+# Options that make those subcommands run programs or write files; they also need confirmation.
+# git accepts unambiguous prefixes of long options, so "--out=x" counts as "--output"
+UNSAFE_GIT_OPTIONS = {
+    "open-files-in-pager", "output", "ext-diff", "textconv", "paginate", "pager", "exec",
+    "exec-path", "upload-pack", "receive-pack", "config-env",
+}
+UNSAFE_GIT_SHORT_OPTIONS = {"O"}  # git grep -O<pager>, also inside clusters such as -nO
+COMMAND_TIMEOUT = float(os.getenv("MINICODER_COMMAND_TIMEOUT", "120"))
+COMMAND_MAX_TIMEOUT = float(os.getenv("MINICODER_COMMAND_MAX_TIMEOUT", "600"))
+COMMAND_WORKERS = int(os.getenv("MINICODER_COMMAND_WORKERS", "4"))
+COMMAND_OUTPUT_LIMIT = int(os.getenv("MINICODER_COMMAND_OUTPUT_LIMIT", "8000"))
+
+# Retrieval settings (BM25 snippets attached to each user message)
+RETRIEVAL_ENABLED = os.getenv("MINICODER_RETRIEVAL", "1") != "0"
+RETRIEVAL_TOP_K = int(os.getenv("MINICODER_RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("MINICODER_RETRIEVAL_TOKENS", "1500"))
+
+# Prefetch settings (files mentioned in the user message are read ahead of the request)
+PREFETCH_ENABLED = os.getenv("MINICODER_PREFETCH", "1") != "0"
+PREFETCH_TOKEN_BUDGET = int(os.getenv("MINICODER_PREFETCH_TOKENS", "8000"))
@@ -0,0 +1,120 @@
+import json
+from src.core.config import CONTEXT_TRIM_TOKENS
+from src.utils.file_operations import estimate_tokens
+
+# --------------------------------------------------------------------------------
+# Conversation Layout
+# --------------------------------------------------------------------------------
+
+# The turn log is compacted only when it grows past TRIM_TRIGGER_TOKENS, and then down to the
+# last TRIM_KEEP_TURNS turns within TRIM_KEEP_TOKENS, so the request prefix stays byte-identical
+# between compactions
+TRIM_TRIGGER_TOKENS = CONTEXT_TRIM_TOKENS
+TRIM_KEEP_TOKENS = CONTEXT_TRIM_TOKENS // 3
+TRIM_KEEP_TURNS = 3
+
+# Providers cache prompt prefixes in blocks; this is the minimum cacheable prefix (~1024 tokens)
+MIN_CACHEABLE_BYTES = 4096
+
+class Conversation(list):
+    """Message list laid out for prompt caching.
+
+    Layout: the system prompt, then pinned context in the order it was added, then an
+    append-only turn log. Context pinned after the first turn is appended to the turn log
+    (so the cached prefix survives) and folded into the pinned block at the next compaction.
+    Context pinned while tool calls are running is held back until flush_pins(), because the
+    API rejects any message between a tool call and its result.
+    """
+
+    def __init__(self, system_prompt: str):
+        super().__init__([{"role": "system", "content": system_prompt}])
+        self.pinned_end = 1
+        self._late_pins = []
+        self._pending_pins = []
+
+    def _in_tool_calls(self) -> bool:
+        last = self[-1]
+        return last["role"] == "tool" or (last["role"] == "assistant" and bool(last.get("tool_calls")))
+
+    def pin(self, content: str):
+        """Add context that must survive compaction (files, folders, repository maps)."""
+        message = {"role": "system", "content": content}
+        if len(self) == self.pinned_end:
+            self.pinned_end += 1
+        elif self._in_tool_calls():
+            self._pending_pins.append(message)
+            return
+        else:
+            self._late_pins.append(message)
+        self.append(message)
+
+    def flush_pins(self):
+        """Append context pinned during tool calls; call once every tool result has been added."""
+        for message in self._pending_pins:
+            self._late_pins.append(message)
+            self.append(message)
+        self._pending_pins = []
+
+    def compact(self):
+        """Drop old turns once the turn log exceeds TRIM_TRIGGER_TOKENS, keeping whole turns.
+
+        A turn runs from a user message to the next one. The last TRIM_KEEP_TURNS turns are kept,
+        fewer if they exceed TRIM_KEEP_TOKENS. If even the latest turn is too long, its user
+        message is kept and the rest is cut before an assistant message, so every tool result
+        still follows the call that produced it.
+        """
+        self.flush_pins()
+        late_pin_ids = {id(message) for message in self._late_pins}
+        turns = [message for message in self[self.pinned_end:] if id(message) not in late_pin_ids]
+        if _message_tokens(turns) <= TRIM_TRIGGER_TOKENS:
+            return
+
+        starts = [i for i, message in enumerate(turns) if message["role"] == "user"] or [0]
+        kept_starts = starts[-TRIM_KEEP_TURNS:]
+        while len(kept_starts) > 1 and _message_tokens(turns[kept_starts[0]:]) > TRIM_KEEP_TOKENS:
+            kept_starts.pop(0)
+        start = kept_starts[0]
+        kept = turns[start:]
+
+        if _message_tokens(kept) > TRIM_KEEP_TOKENS:
+            head = [kept[0]] if kept[0]["role"] == "user" else []
+            cuts = [i for i, message in enumerate(kept) if i > 0 and message["role"] == "assistant"]
+            for cut in cuts:
+                if _message_tokens(head + kept[cut:]) <= TRIM_KEEP_TOKENS:
+                    kept = head + kept[cut:]
+                    break
+            else:
+                if cuts:
+                    kept = head + kept[cuts[-1]:]
+
+        pinned = self[:self.pinned_end] + self._late_pins
+        self[:] = pinned + kept
+        self.pinned_end = len(pinned)
+        self._late_pins = []
+
+def _message_tokens(messages) -> int:
+    return estimate_tokens(json.dumps(messages))
+
+class PrefixCacheEstimator:
+    """Compares each request with the previous one to estimate how much of it a prefix cache can reuse."""
+
+    def __init__(self):
+        self._last_request = None
+
+    def observe(self, messages, tools) -> tuple:
+        """Return (unchanged prefix bytes, total bytes) for this request and remember it."""
+        request = json.dumps({"tools": tools, "messages": messages})
+        previous, self._last_request = self._last_request, request
+        if previous is None:
+            return 0, len(request)
+        limit = min(len(previous), len(request))
+        unchanged = 0
+        # Compare in blocks first, then narrow down inside the first differing block
+        block = 4096
+        while unchanged + block <= limit and previous[unchanged:unchanged + block] == request[unchanged:unchanged + block]:
+            unchanged += block
+        while unchanged < limit and previous[unchanged] == request[unchanged]:
+            unchanged += 1
+        if unchanged < MIN_CACHEABLE_BYTES:
+            unchanged = 0
+        return unchanged, len(request)
@@ -1,21 +1,53 @@
 #!/usr/bin/env python3
 
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import List, Literal, Optional
 from textwrap import dedent
 
 # --------------------------------------------------------------------------------
 # Pydantic Models
 # --------------------------------------------------------------------------------
 
+# Tool argument models: the JSON schema sent to the API is generated from these
+
+class FileToRead(BaseModel):
+    file_path: str = Field(description="The path to the file to read (relative or absolute)")
+
+class FilesToRead(BaseModel):
+    file_paths: List[str] = Field(description="Array of file paths to read (relative or absolute)")
+
 class FileToCreate(BaseModel):
     path: str
     content: str
 
+class FileToWrite(BaseModel):
+    file_path: str = Field(description="The path where the file should be created")
+    content: str = Field(description="The content to write to the file")
+    mode: Literal["overwrite", "append"] = Field(
+        "overwrite", description="'overwrite' (default) replaces the file, 'append' adds content to its end"
+    )
+    partial: bool = Field(
+        False, description="Set to true when more chunks will be appended, to skip the syntax check until the last chunk"
+    )
+
+class FilesToCreate(BaseModel):
+    files: List[FileToCreate] = Field(description="Array of files to create with their paths and content")
+
 class FileToEdit(BaseModel):
-    path: str
-    original_snippet: str
-    new_snippet: str
+    file_path: str = Field(description="The path to the file to edit")
+    original_snippet: str = Field(
+        description="The exact text snippet to find and replace - include enough context to make it unique"
+    )
+    new_snippet: str = Field(description="The new text to replace the original snippet with")
+
+class CommandsToRun(BaseModel):
+    commands: List[str] = Field(
+        description="Commands to run, e.g. ['pytest -q tests/test_api.py']. Several independent commands (such as test shards) run in parallel"
+    )
+    cwd: str = Field(".", description="Working directory relative to the workspace root")
+    timeout: Optional[float] = Field(None, description="Wall-clock limit in seconds for each command")
+    # Set by confirm_commands on the main thread before dispatch; not part of the tool schema
+    _confirmed: List[bool] = PrivateAttr(default_factory=list)
 
 # --------------------------------------------------------------------------------
 # System Prompt
@@ -39,6 +71,7 @@ SYSTEM_PROMPT = dedent("""\
        - create_file: Create or overwrite a single file
        - create_multiple_files: Create multiple files at once
        - edit_file: Make edits to existing files (MUST use this when user asks to edit files) 
+       - run_command: Run tests, linters or build commands and see their exit code and output
 
     Guidelines:
     1. Provide natural, conversational responses explaining your reasoning
@@ -52,15 +85,16 @@ SYSTEM_PROMPT = dedent("""\
        - Consider the impact of changes on the overall codebase
        - For complex edits, break them into smaller, manageable changes
        - EXAMPLE: If user says "add endpoints to hello_world.py", you MUST call edit_file function, not just show the code
+       - When a repository map (outline) is in context, use it to locate code and read only the files you need
     4. Follow language-specific best practices
-    5. Suggest tests or validation steps when appropriate
+    5. After changing code, use run_command to run the relevant tests or linters and fix any failures
     6. Be thorough in your analysis and recommendations
 
     CRITICAL: When the user asks you to edit, modify, or add content to files, you MUST use the edit_file function call IMMEDIATELY. Do not describe what you plan to do - just do it. Do not show the code - actually make the changes using the available tools.
 
     IMPORTANT: After reading a file, if the user wants you to edit it, proceed DIRECTLY to the edit_file function call without any additional explanation or planning. Cut your thinking short and act immediately when file operations are needed.
 
-    ACTION REQUIRED: When editing files, you must call edit_file function in the SAME response where you read the file. Do not wait for follow-up responses.
+    ACTION REQUIRED: You work in a loop. After your function calls run you receive their results and can make more calls (read, then edit, then read the next file). Keep going until the whole task is done, then reply without function calls to finish. Do not stop halfway to ask the user to say "continue".
 
     Remember: You're a senior engineer - be thoughtful, precise, and explain your reasoning clearly. Always use function calls to actually make changes to files when requested.
 
@@ -68,6 +102,6 @@ SYSTEM_PROMPT = dedent("""\
     1. Read the file (if not already read)
     2. IMMEDIATELY call edit_file function in the SAME response
     3. Do NOT describe your plan or ask for confirmation
-    4. Do NOT wait for follow-up responses
+    4. Continue with further function calls until the task is complete
     5. Just execute the edit immediately
 """)
@@ -0,0 +1,26 @@
+import math
+from src.core.config import COMMAND_TIMEOUT, COMMAND_MAX_TIMEOUT, COMMAND_WORKERS
+from src.core.models import CommandsToRun
+from src.utils.commands import run_commands, confirm_command
+
+# --------------------------------------------------------------------------------
+# Command Tool Handlers
+# --------------------------------------------------------------------------------
+
+def _command_timeout(args: CommandsToRun) -> float:
+    timeout = args.timeout if args.timeout is not None else COMMAND_TIMEOUT
+    return min(timeout, COMMAND_MAX_TIMEOUT)
+
+def confirm_commands(args: CommandsToRun):
+    """Ask about commands that need confirmation; runs on the main thread before the time limit starts."""
+    args._confirmed = [confirm_command(command, args.cwd) for command in args.commands]
+
+def run_command_time_limit(args: CommandsToRun) -> float:
+    """Time limit for the whole call: commands beyond COMMAND_WORKERS queue behind the others."""
+    waves = max(1, math.ceil(len(args.commands) / COMMAND_WORKERS))
+    return waves * _command_timeout(args) + 10
+
+def run_command(args: CommandsToRun, conversation_history) -> str:
+    if not args.commands:
+        return "Error: No commands provided"
+    return run_commands(args.commands, args.cwd, _command_timeout(args), confirmed=args._confirmed)
@@ -1,112 +1,72 @@
+from src.core.config import CHUNKED_WRITE_THRESHOLD, ALLOWED_COMMANDS, CONFIRM_COMMANDS
+from src.core.models import (
+    FileToRead, FilesToRead, FileToWrite, FilesToCreate, FileToEdit, CommandsToRun
+)
+from src.tools.registry import Tool, ToolRegistry
+
 # --------------------------------------------------------------------------------
 # OpenAI Function Calling Tools
 # --------------------------------------------------------------------------------
 
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "read_file",
-            "description": "Read the content of a single file from the filesystem",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "file_path": {
-                        "type": "string",
-                        "description": "The path to the file to read (relative or absolute)",
-                    }
-                },
-                "required": ["file_path"]
-            },
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "read_multiple_files",
-            "description": "Read the content of multiple files from the filesystem",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "file_paths": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Array of file paths to read (relative or absolute)",
-                    }
-                },
-                "required": ["file_paths"]
-            },
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "create_file",
-            "description": "Create a new file or overwrite an existing file with the provided content",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "file_path": {
-                        "type": "string",
-                        "description": "The path where the file should be created",
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "The content to write to the file",
-                    }
-                },
-                "required": ["file_path", "content"]
-            },
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "create_multiple_files",
-            "description": "Create multiple files at once",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "files": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "path": {"type": "string"},
-                                "content": {"type": "string"}
-                            },
-                            "required": ["path", "content"]
-                        },
-                        "description": "Array of files to create with their paths and content",
-                    }
-                },
-                "required": ["files"]
-            },
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "edit_file",
-            "description": "Edit an existing file by replacing a specific snippet with new content or adding new lines of code. ALWAYS use this function when the user asks you to edit, modify, or add content to files. EXECUTE IMMEDIATELY after reading a file - do not describe what you plan to do, just do it.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "file_path": {
-                        "type": "string",
-                        "description": "The path to the file to edit",
-                    },
-                    "original_snippet": {
-                        "type": "string",
-                        "description": "The exact text snippet to find and replace - include enough context to make it unique",
-                    },
-                    "new_snippet": {
-                        "type": "string",
-                        "description": "The new text to replace the original snippet with",
-                    }
-                },
-                "required": ["file_path", "original_snippet", "new_snippet"]
-            },
-        }
-    }
-]
+# Each tool is declared once; handlers are "module:function" targets imported on first call
+registry = ToolRegistry()
+
+registry.register(Tool(
+    name="read_file",
+    description="Read the content of a single file from the filesystem",
+    args_model=FileToRead,
+    handler="src.tools.file_tools:read_file",
+    read_only=True,
+))
+
+registry.register(Tool(
+    name="read_multiple_files",
+    description="Read the content of multiple files from the filesystem",
+    args_model=FilesToRead,
+    handler="src.tools.file_tools:read_multiple_files",
+    read_only=True,
+))
+
+registry.register(Tool(
+    name="create_file",
+    description=(
+        "Create a new file or overwrite an existing file with the provided content. "
+        f"For content longer than about {CHUNKED_WRITE_THRESHOLD} characters, write the first part "
+        "normally and the rest in further calls with mode 'append', setting partial on all but the last chunk. "
+        "Python, JSON, TOML and YAML content is syntax-checked before writing; on errors nothing is written "
+        "and the errors are returned with line numbers"
+    ),
+    args_model=FileToWrite,
+    handler="src.tools.file_tools:write_file",
+))
+
+registry.register(Tool(
+    name="create_multiple_files",
+    description="Create multiple files at once",
+    args_model=FilesToCreate,
+    handler="src.tools.file_tools:write_multiple_files",
+))
+
+registry.register(Tool(
+    name="edit_file",
+    description="Edit an existing file by replacing a specific snippet with new content or adding new lines of code. ALWAYS use this function when the user asks you to edit, modify, or add content to files. EXECUTE IMMEDIATELY after reading a file - do not describe what you plan to do, just do it.",
+    args_model=FileToEdit,
+    handler="src.tools.file_tools:edit_file",
+))
+
+registry.register(Tool(
+    name="run_command",
+    description=(
+        "Run one or more commands (tests, linters, builds) in the workspace and return each exit code "
+        "with the tail of stdout/stderr. Commands run without a shell, so pipes and redirects are not "
+        f"available. Allowed programs: {', '.join(sorted(ALLOWED_COMMANDS))}. These need the user's confirmation "
+        f"(a refusal is reported as an error): {', '.join(sorted(CONFIRM_COMMANDS))}, and git subcommands that "
+        "change the repository. Paths outside the workspace are rejected"
+    ),
+    args_model=CommandsToRun,
+    handler="src.tools.command_tools:run_command",
+    prepare="src.tools.command_tools:confirm_commands",
+    timeout_for="src.tools.command_tools:run_command_time_limit",
+))
+
+tools = registry.schemas()
@@ -0,0 +1,90 @@
+from rich.panel import Panel
+from src.core.config import console
+from src.core.models import FileToRead, FilesToRead, FileToWrite, FilesToCreate, FileToEdit
+from src.utils.file_operations import (
+    read_local_file, normalize_path, create_file, check_write,
+    apply_diff_edit
+)
+from src.utils.validation import format_errors, SyntaxCheckError
+
+# --------------------------------------------------------------------------------
+# File Tool Handlers
+# --------------------------------------------------------------------------------
+
+def read_file(args: FileToRead, conversation_history) -> str:
+    normalized_path = normalize_path(args.file_path)
+    content = read_local_file(normalized_path)
+    return f"Content of file '{normalized_path}':\n\n{content}"
+
+def read_multiple_files(args: FilesToRead, conversation_history) -> str:
+    results = []
+    for file_path in args.file_paths:
+        try:
+            normalized_path = normalize_path(file_path)
+            content = read_local_file(normalized_path)
+            results.append(f"Content of file '{normalized_path}':\n\n{content}")
+        except OSError as e:
+            results.append(f"Error reading '{file_path}': {e}")
+    return "\n\n" + "="*50 + "\n\n".join(results)
+
+def _with_remaining_errors(result: str, remaining: str) -> str:
+    return f"{result}, but the file still does not parse. {remaining}" if remaining else result
+
+def write_file(args: FileToWrite, conversation_history) -> str:
+    try:
+        if args.mode == "append":
+            remaining = create_file(args.file_path, args.content, append=True, validate=not args.partial)
+            return _with_remaining_errors(f"Successfully appended to file '{args.file_path}'", remaining)
+        remaining = create_file(args.file_path, args.content, validate=not args.partial)
+        return _with_remaining_errors(f"Successfully created file '{args.file_path}'", remaining)
+    except SyntaxCheckError as e:
+        return f"Error: {e}"
+
+def write_multiple_files(args: FilesToCreate, conversation_history) -> str:
+    # Check every file before writing any, so a syntax error doesn't leave a half-created set
+    errors = []
+    remaining = []
+    for file_info in args.files:
+        try:
+            file_errors = check_write(file_info.path, file_info.content)
+            if file_errors:
+                remaining.append(format_errors(file_info.path, file_errors))
+        except SyntaxCheckError as e:
+            errors.append(str(e))
+    if errors:
+        return "Error: no files were created.\n" + "\n".join(errors)
+
+    created_files = []
+    for file_info in args.files:
+        create_file(file_info.path, file_info.content, validate=False)
+        created_files.append(file_info.path)
+    result = f"Successfully created {len(created_files)} files: {', '.join(created_files)}"
+    return _with_remaining_errors(result, "\n".join(remaining))
+
+def edit_file(args: FileToEdit, conversation_history) -> str:
+    file_path = args.file_path
+
+    # The file is not pinned into the conversation here: the edit is about to change it, and a
+    # pinned copy of the old content would go stale (and hide the new one from prefetch/retrieval)
+
+    # Try to apply the edit
+    try:
+        remaining = apply_diff_edit(file_path, args.original_snippet, args.new_snippet)
+        return _with_remaining_errors(f"Successfully edited file '{file_path}'", remaining)
+    except SyntaxCheckError as e:
+        # The file is untouched; hand the parse errors straight back so the edit can be corrected
+        return f"Error editing file '{file_path}': {e}"
+    except Exception as e:
+        # Provide more detailed error information
+        error_details = f"Error editing file '{file_path}': {str(e)}"
+        console.print(f"[bold red]✗[/bold red] {error_details}")
+
+        # Show the actual file content for debugging
+        try:
+            current_content = read_local_file(file_path)
+            console.print("\n[bold blue]Current file content:[/bold blue]")
+            console.print(Panel(current_content, title="Current Content", border_style="yellow", title_align="left"))
+        except Exception as read_error:
+            console.print(f"[dim]Could not read file for debugging: {read_error}[/dim]")
+
+        return error_details
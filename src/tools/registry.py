@@ -0,0 +1,165 @@
+import importlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Type
+from pydantic import BaseModel, ValidationError
+from src.core.config import TOOL_TIMEOUT, TOOL_PROCESS_WORKERS, TOOL_MEMORY_LIMIT_MB
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# --------------------------------------------------------------------------------
+# Tool Registry
+# --------------------------------------------------------------------------------
+
+_handler_cache = {}
+
+def _load_handler(target: str):
+    """Import 'package.module:function' on first use."""
+    handler = _handler_cache.get(target)
+    if handler is None:
+        module_name, function_name = target.split(":")
+        handler = getattr(importlib.import_module(module_name), function_name)
+        _handler_cache[target] = handler
+    return handler
+
+def _limit_worker_memory(limit_mb: int):
+    if resource is not None and limit_mb > 0:
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _ping() -> bool:
+    return True
+
+def _run_isolated(target: str, args: BaseModel) -> str:
+    return _load_handler(target)(args, None)
+
+def _inline_refs(schema: dict, defs: dict):
+    """Resolve $ref entries and drop titles so the schema matches the hand-written style."""
+    if isinstance(schema, dict):
+        if "$ref" in schema:
+            return _inline_refs(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in schema.items() if key not in ("title", "$defs")}
+    if isinstance(schema, list):
+        return [_inline_refs(item, defs) for item in schema]
+    return schema
+
+class Tool:
+    """A tool declared once: its argument model drives the schema, its handler is imported lazily."""
+
+    def __init__(self, name: str, description: str, args_model: Type[BaseModel], handler: str,
+                 read_only: bool = False, isolated: bool = False, timeout: Optional[float] = None,
+                 prepare: Optional[str] = None, timeout_for: Optional[str] = None):
+        self.name = name
+        self.description = description
+        self.args_model = args_model
+        self.handler = handler
+        self.read_only = read_only
+        self.isolated = isolated
+        self.timeout = timeout if timeout is not None else TOOL_TIMEOUT
+        # Optional "module:function" targets: 'prepare(args)' runs on the dispatching thread before the
+        # time limit starts (e.g. to ask the user something); 'timeout_for(args)' sizes the limit per call
+        self.prepare = prepare
+        self.timeout_for = timeout_for
+
+    def call_timeout(self, args: BaseModel) -> float:
+        return _load_handler(self.timeout_for)(args) if self.timeout_for else self.timeout
+
+    def schema(self) -> dict:
+        raw = self.args_model.model_json_schema()
+        parameters = _inline_refs(raw, raw.get("$defs", {}))
+        parameters.setdefault("required", [])
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": parameters,
+            }
+        }
+
+class ToolRegistry:
+    """Name -> Tool table used for both the API schemas and dispatch."""
+
+    def __init__(self):
+        self._tools = {}
+        self._thread_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tool")
+        self._process_pool = None
+        # (tool name, future) for mutating calls that timed out but whose thread is still running
+        self._unfinished_writes = []
+
+    def register(self, tool: Tool) -> Tool:
+        self._tools[tool.name] = tool
+        return tool
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def schemas(self):
+        return [tool.schema() for tool in self._tools.values()]
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = multiprocessing.get_context("spawn").Pool(
+                TOOL_PROCESS_WORKERS, initializer=_limit_worker_memory, initargs=(TOOL_MEMORY_LIMIT_MB,)
+            )
+            # Wait for a worker to finish starting so its startup is not charged to the tool's timeout
+            self._process_pool.apply(_ping)
+        return self._process_pool
+
+    def _reset_process_pool(self):
+        if self._process_pool is not None:
+            self._process_pool.terminate()
+            self._process_pool = None
+
+    def dispatch(self, name: str, arguments: dict, conversation_history) -> str:
+        """Validate 'arguments' against the tool's model and run it within its time limit."""
+        tool = self._tools.get(name)
+        if tool is None:
+            return f"Unknown function: {name}"
+        try:
+            args = tool.args_model(**arguments)
+        except ValidationError as e:
+            return f"Error: invalid arguments for {name}: {e}"
+        if not tool.read_only:
+            # A timed-out write may still be changing files; don't let another write race it
+            self._unfinished_writes = [(other, future) for other, future in self._unfinished_writes if not future.done()]
+            if self._unfinished_writes:
+                other = self._unfinished_writes[0][0]
+                return (f"Error: {name} was not run because an earlier {other} call timed out and is still running. "
+                        "Read the affected files to check their state, then try again.")
+        if tool.prepare:
+            _load_handler(tool.prepare)(args)
+        timeout = tool.call_timeout(args)
+
+        if tool.isolated:
+            # Runs in a worker process: the process is killed on timeout and memory is capped
+            pending = self._get_process_pool().apply_async(_run_isolated, (tool.handler, args))
+            try:
+                return pending.get(timeout=timeout)
+            except multiprocessing.TimeoutError:
+                self._reset_process_pool()
+                return f"Error: {name} timed out after {timeout}s and was terminated"
+            except MemoryError:
+                self._reset_process_pool()
+                return f"Error: {name} exceeded the {TOOL_MEMORY_LIMIT_MB}MB memory limit"
+
+        handler = _load_handler(tool.handler)
+        pending = self._thread_pool.submit(handler, args, conversation_history)
+        try:
+            return pending.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Threads cannot be killed; drop the worker so later calls are not queued behind it
+            self._thread_pool.shutdown(wait=False)
+            self._thread_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tool")
+            if tool.read_only:
+                return f"Error: {name} timed out after {timeout}s."
+            self._unfinished_writes.append((name, pending))
+            return (f"Error: {name} timed out after {timeout}s. It may still complete in the background; "
+                    "other file-changing tools are blocked until it finishes.")
+
+    def shutdown(self):
+        self._thread_pool.shutdown(wait=False)
+        self._reset_process_pool()
@@ -18,9 +18,11 @@ def display_welcome_message():
     instructions = """[bold #c084fc]📁 File Operations:[/bold #c084fc]
   • [#f472b6]/add path/to/file[/#f472b6] - Include a single file in conversation
   • [#f472b6]/add path/to/folder[/#f472b6] - Include all files in a folder
+  • [#f472b6]/map path/to/folder[/#f472b6] - Include a compact outline of a folder (low token cost)
   • [#6b7280]The AI can automatically read and create files using function calls[/#6b7280]
 
 [bold #c084fc]🎯 Commands:[/bold #c084fc]
+  • [#f472b6]/fast your message[/#f472b6] - Send one turn to the fast backend (e.g. a local model)
   • [#f472b6]exit[/#f472b6] or [#f472b6]quit[/#f472b6] - End the session
   • Just ask naturally - the AI will handle file operations automatically!"""
     
@@ -0,0 +1,192 @@
+import os
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from rich.markup import escape
+from src.core.config import (
+    console, WORKSPACE_ROOT, ALLOWED_COMMANDS, CONFIRM_COMMANDS, READ_ONLY_GIT_SUBCOMMANDS,
+    UNSAFE_GIT_OPTIONS, UNSAFE_GIT_SHORT_OPTIONS,
+    COMMAND_TIMEOUT, COMMAND_MAX_TIMEOUT, COMMAND_WORKERS, COMMAND_OUTPUT_LIMIT
+)
+from src.utils.file_operations import normalize_path
+
+# --------------------------------------------------------------------------------
+# Command Execution
+# --------------------------------------------------------------------------------
+
+_command_pool = ThreadPoolExecutor(max_workers=COMMAND_WORKERS, thread_name_prefix="command")
+
+class RingBuffer:
+    """Keeps the last 'limit' bytes written to it and counts everything that passed through."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.total = 0
+        self._chunks = deque()
+        self._size = 0
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        self._chunks.append(data)
+        self._size += len(data)
+        while self._size - len(self._chunks[0]) >= self.limit:
+            self._size -= len(self._chunks.popleft())
+
+    def tail(self) -> str:
+        return b"".join(self._chunks)[-self.limit:].decode("utf-8", errors="replace")
+
+def _drain(stream, buffer: RingBuffer):
+    for chunk in iter(lambda: stream.read1(4096), b""):
+        buffer.write(chunk)
+    stream.close()
+
+def _in_workspace(path: str) -> bool:
+    return path == WORKSPACE_ROOT or path.startswith(WORKSPACE_ROOT + os.sep)
+
+def _path_values(argument: str):
+    """Yield the parts of 'argument' that could be a path: the argument itself and, for options,
+    the value attached to it ('--opt=PATH', '-fPATH', or '-rfPATH' after other short flags)."""
+    yield argument
+    if argument.startswith("--"):
+        if "=" in argument:
+            yield argument.split("=", 1)[1]
+    elif argument.startswith("-"):
+        for i in range(2, len(argument)):
+            yield argument[i:]
+            if not argument[i].isalpha():
+                break
+
+def _check_path_argument(argument: str, workdir: str):
+    """Reject arguments naming an existing path outside the workspace, including option values."""
+    for value in _path_values(argument):
+        if not (os.path.isabs(value) or value.startswith("~") or ".." in value.split(os.sep)):
+            continue
+        path = os.path.realpath(os.path.join(workdir, os.path.expanduser(value)))
+        # Patterns such as "/api/" that name nothing on disk are left alone
+        if not _in_workspace(path) and (os.path.exists(path) or os.path.isdir(os.path.dirname(path))):
+            raise ValueError(f"Argument '{argument}' refers to a path outside the workspace")
+
+def resolve_command(command: str, cwd: str):
+    """Split 'command' and check it against the allowlists and the workspace jail. Raises ValueError."""
+    argv = shlex.split(command)
+    if not argv:
+        raise ValueError("Empty command")
+    program = os.path.basename(argv[0])
+    if program not in ALLOWED_COMMANDS and program not in CONFIRM_COMMANDS:
+        allowed = sorted(ALLOWED_COMMANDS | CONFIRM_COMMANDS)
+        raise ValueError(f"'{program}' is not an allowed command (allowed: {', '.join(allowed)})")
+    workdir = normalize_path(os.path.join(WORKSPACE_ROOT, cwd))
+    if not _in_workspace(workdir):
+        raise ValueError(f"Working directory '{cwd}' is outside the workspace")
+    if not os.path.isdir(workdir):
+        raise ValueError(f"Working directory '{cwd}' does not exist")
+    for argument in argv[1:]:
+        _check_path_argument(argument, workdir)
+    return argv, workdir
+
+def needs_confirmation(argv) -> bool:
+    """True for commands that can run arbitrary code or change state (see CONFIRM_COMMANDS)."""
+    program = os.path.basename(argv[0])
+    if program in CONFIRM_COMMANDS:
+        return True
+    if program == "git":
+        # Options before the subcommand (-c, -C, --exec-path...) can change what runs
+        if len(argv) < 2 or argv[1] not in READ_ONLY_GIT_SUBCOMMANDS:
+            return True
+        return any(_is_unsafe_git_option(argument) for argument in argv[2:])
+    return False
+
+def _is_unsafe_git_option(argument: str) -> bool:
+    if argument.startswith("--"):
+        name = argument[2:].split("=", 1)[0]
+        return bool(name) and any(option.startswith(name) for option in UNSAFE_GIT_OPTIONS)
+    if argument.startswith("-"):
+        return any(letter in UNSAFE_GIT_SHORT_OPTIONS for letter in argument[1:])
+    return False
+
+def confirm_command(command: str, cwd: str) -> bool:
+    """Ask the user before running a command that needs confirmation; True for any other command."""
+    try:
+        argv, _ = resolve_command(command, cwd)
+    except ValueError:
+        return True  # run_command reports the error
+    if not needs_confirmation(argv):
+        return True
+    try:
+        answer = console.input(f"[bold #f59e0b]⚠ Allow the AI to run[/bold #f59e0b] [#f472b6]{escape(command)}[/#f472b6]? [y/N] ")
+    except (EOFError, KeyboardInterrupt):
+        return False
+    return answer.strip().lower() in ("y", "yes")
+
+def run_command(command: str, cwd: str = ".", timeout: float = COMMAND_TIMEOUT, confirmed: bool = False) -> str:
+    """Run one allowlisted command and return a report with its exit code and the tail of its output.
+
+    Commands that need confirmation are refused unless 'confirmed' (see confirm_command).
+    """
+    try:
+        argv, workdir = resolve_command(command, cwd)
+    except ValueError as e:
+        return f"$ {command}\nError: {e}"
+    if needs_confirmation(argv) and not confirmed:
+        return f"$ {command}\nError: the user did not allow this command"
+    timeout = min(timeout, COMMAND_MAX_TIMEOUT)
+
+    stdout, stderr = RingBuffer(COMMAND_OUTPUT_LIMIT), RingBuffer(COMMAND_OUTPUT_LIMIT)
+    start = time.monotonic()
+    try:
+        process = subprocess.Popen(
+            argv, cwd=workdir, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=(os.name == "posix"),
+        )
+    except OSError as e:
+        return f"$ {command}\nError: could not start command: {e}"
+
+    readers = [
+        threading.Thread(target=_drain, args=(process.stdout, stdout), daemon=True),
+        threading.Thread(target=_drain, args=(process.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        exit_code = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        # Kill the whole process group so test runners don't leave workers behind
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        exit_code = process.wait()
+    for reader in readers:
+        reader.join(timeout=5)
+    elapsed = time.monotonic() - start
+
+    status = f"timed out after {timeout:g}s" if timed_out else f"exit code {exit_code}"
+    rel_cwd = os.path.relpath(workdir, WORKSPACE_ROOT)
+    report = [f"$ {command}  (cwd: {rel_cwd}, {status}, {elapsed:.1f}s)"]
+    for name, buffer in (("stdout", stdout), ("stderr", stderr)):
+        if buffer.total:
+            truncated = f", last {COMMAND_OUTPUT_LIMIT} of {buffer.total} bytes" if buffer.total > COMMAND_OUTPUT_LIMIT else ""
+            report.append(f"--- {name}{truncated} ---\n{buffer.tail().rstrip()}")
+    return "\n".join(report)
+
+def run_commands(commands, cwd: str = ".", timeout: float = COMMAND_TIMEOUT, confirmed=()) -> str:
+    """Run independent commands in parallel on the bounded command pool and join their reports in order.
+
+    'confirmed' holds the answers from confirm_command for each command; commands that need
+    confirmation and have no 'yes' are refused.
+    """
+    for command in commands:
+        console.print(f"[#6b7280]  $ {command}[/#6b7280]")
+    confirmed = list(confirmed) + [False] * (len(commands) - len(confirmed))
+    futures = [
+        _command_pool.submit(run_command, command, cwd, timeout, ok)
+        for command, ok in zip(commands, confirmed)
+    ]
+    return "\n\n".join(future.result() for future in futures)
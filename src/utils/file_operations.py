@@ -1,19 +1,67 @@
 import os
+import re
 from pathlib import Path
 from rich.panel import Panel
 from src.core.config import console
+from src.utils.validation import validate_content, format_errors, has_syntax_check, SyntaxCheckError
 
 # --------------------------------------------------------------------------------
 # File Operations
 # --------------------------------------------------------------------------------
 
+EXCLUDED_FILES = {
+    # Python specific
+    ".DS_Store", "Thumbs.db", ".gitignore", ".python-version",
+    "uv.lock", ".uv", "uvenv", ".uvenv", ".venv", "venv",
+    "__pycache__", ".pytest_cache", ".coverage", ".mypy_cache",
+    # Node.js / Web specific
+    "node_modules", "package-lock.json", "yarn.lock", "pnpm-lock.yaml",
+    ".next", ".nuxt", "dist", "build", ".cache", ".parcel-cache",
+    ".turbo", ".vercel", ".output", ".contentlayer",
+    # Build outputs
+    "out", "coverage", ".nyc_output", "storybook-static",
+    # Environment and config
+    ".env", ".env.local", ".env.development", ".env.production",
+    # Misc
+    ".git", ".svn", ".hg", "CVS"
+}
+EXCLUDED_EXTENSIONS = {
+    # Binary and media files
+    ".png", ".jpg", ".jpeg", ".gif", ".ico", ".svg", ".webp", ".avif",
+    ".mp4", ".webm", ".mov", ".mp3", ".wav", ".ogg",
+    ".zip", ".tar", ".gz", ".7z", ".rar",
+    ".exe", ".dll", ".so", ".dylib", ".bin",
+    # Documents
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+    # Python specific
+    ".pyc", ".pyo", ".pyd", ".egg", ".whl",
+    # UV specific
+    ".uv", ".uvenv",
+    # Database and logs
+    ".db", ".sqlite", ".sqlite3", ".log",
+    # IDE specific
+    ".idea", ".vscode",
+    # Web specific
+    ".map", ".chunk.js", ".chunk.css",
+    ".min.js", ".min.css", ".bundle.js", ".bundle.css",
+    # Cache and temp files
+    ".cache", ".tmp", ".temp",
+    # Font files
+    ".ttf", ".otf", ".woff", ".woff2", ".eot"
+}
+
 def read_local_file(file_path: str) -> str:
     """Return the text content of a local file."""
     with open(file_path, "r", encoding="utf-8") as f:
         return f.read()
 
-def create_file(path: str, content: str):
-    """Create (or overwrite) a file at 'path' with the given 'content'."""
+def create_file(path: str, content: str, append: bool = False, validate: bool = True):
+    """Create (or overwrite) a file at 'path' with the given 'content'. With 'append', add to the end instead.
+
+    With 'validate', Python/JSON/TOML/YAML content is parsed first and SyntaxCheckError is raised
+    (and nothing is written) if the resulting file would not parse. Returns a message describing
+    errors that remain in a file that was already broken before this write, or "".
+    """
     file_path = Path(path)
     
     # Security checks
@@ -25,10 +73,32 @@ def create_file(path: str, content: str):
     if len(content) > 5_000_000:  # 5MB limit
         raise ValueError("File content exceeds 5MB size limit")
     
+    remaining = check_write(str(file_path), content, append) if validate else []
+
     file_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(file_path, "w", encoding="utf-8") as f:
+    with open(file_path, "a" if append else "w", encoding="utf-8") as f:
         f.write(content)
-    console.print(f"[bold #10b981]✓[/bold #10b981] Created/updated file at '[#f472b6]{file_path}[/#f472b6]'")
+    action = "Appended to" if append else "Created/updated"
+    console.print(f"[bold #10b981]✓[/bold #10b981] {action} file at '[#f472b6]{file_path}[/#f472b6]'")
+    return format_errors(str(file_path), remaining) if remaining else ""
+
+def check_write(path: str, content: str, append: bool = False):
+    """Syntax-check the file 'path' would hold after writing 'content' (see validate_content).
+
+    Raises SyntaxCheckError if it would not parse; returns the errors left in a file that was
+    already broken. Only files with a syntax checker are read, and an existing file that cannot
+    be decoded counts as already broken.
+    """
+    if not has_syntax_check(path):
+        return []
+    previous, previous_broken = None, False
+    if os.path.isfile(path):
+        try:
+            previous = read_local_file(path)
+        except UnicodeDecodeError:
+            previous_broken = True
+    full_content = (previous or "") + content if append else content
+    return validate_content(path, full_content, previous, previous_broken)
 
 def apply_diff_edit(path: str, original_snippet: str, new_snippet: str):
     """Reads the file at 'path', replaces the first occurrence of 'original_snippet' with 'new_snippet', then overwrites."""
@@ -69,12 +139,16 @@ def apply_diff_edit(path: str, original_snippet: str, new_snippet: str):
             console.print(f"[bold #f59e0b]⚠ Multiple matches ({occurrences}) found - using first occurrence[/bold #f59e0b]")
         
         updated_content = content.replace(original_snippet, new_snippet, 1)
-        create_file(path, updated_content)
+        remaining = create_file(path, updated_content)
         console.print(f"[bold #10b981]✓[/bold #10b981] Applied diff edit to '[#f472b6]{path}[/#f472b6]'")
+        return remaining
 
     except FileNotFoundError:
         console.print(f"[bold #ef4444]✗[/bold #ef4444] File not found for diff editing: '[#f472b6]{path}[/#f472b6]'")
         raise
+    except SyntaxCheckError as e:
+        console.print(f"[bold #f59e0b]⚠[/bold #f59e0b] Edit to '[#f472b6]{path}[/#f472b6]' rejected:\n{e}")
+        raise
     except ValueError as e:
         console.print(f"[bold #f59e0b]⚠[/bold #f59e0b] {str(e)} in '[#f472b6]{path}[/#f472b6]'. No changes made.")
         console.print("\n[bold #c084fc]Expected snippet:[/bold #c084fc]")
@@ -107,47 +181,6 @@ def is_binary_file(file_path: str, peek_size: int = 1024) -> bool:
 
 def add_directory_to_conversation(directory_path: str, conversation_history):
     """Add all files in a directory to the conversation context."""
-    excluded_files = {
-        # Python specific
-        ".DS_Store", "Thumbs.db", ".gitignore", ".python-version",
-        "uv.lock", ".uv", "uvenv", ".uvenv", ".venv", "venv",
-        "__pycache__", ".pytest_cache", ".coverage", ".mypy_cache",
-        # Node.js / Web specific
-        "node_modules", "package-lock.json", "yarn.lock", "pnpm-lock.yaml",
-        ".next", ".nuxt", "dist", "build", ".cache", ".parcel-cache",
-        ".turbo", ".vercel", ".output", ".contentlayer",
-        # Build outputs
-        "out", "coverage", ".nyc_output", "storybook-static",
-        # Environment and config
-        ".env", ".env.local", ".env.development", ".env.production",
-        # Misc
-        ".git", ".svn", ".hg", "CVS"
-    }
-    excluded_extensions = {
-        # Binary and media files
-        ".png", ".jpg", ".jpeg", ".gif", ".ico", ".svg", ".webp", ".avif",
-        ".mp4", ".webm", ".mov", ".mp3", ".wav", ".ogg",
-        ".zip", ".tar", ".gz", ".7z", ".rar",
-        ".exe", ".dll", ".so", ".dylib", ".bin",
-        # Documents
-        ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
-        # Python specific
-        ".pyc", ".pyo", ".pyd", ".egg", ".whl",
-        # UV specific
-        ".uv", ".uvenv",
-        # Database and logs
-        ".db", ".sqlite", ".sqlite3", ".log",
-        # IDE specific
-        ".idea", ".vscode",
-        # Web specific
-        ".map", ".chunk.js", ".chunk.css",
-        ".min.js", ".min.css", ".bundle.js", ".bundle.css",
-        # Cache and temp files
-        ".cache", ".tmp", ".temp",
-        # Font files
-        ".ttf", ".otf", ".woff", ".woff2", ".eot"
-    }
-    
     with console.status("[bold bright_blue]🔍 Scanning directory...[/bold bright_blue]") as status:
         skipped_files = []
         added_files = []
@@ -162,18 +195,18 @@ def add_directory_to_conversation(directory_path: str, conversation_history):
 
             status.update(f"[bold bright_blue]🔍 Scanning {root}...[/bold bright_blue]")
             # Skip hidden directories and excluded directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in excluded_files]
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in EXCLUDED_FILES]
 
             for file in files:
                 if total_files_processed >= max_files:
                     break
 
-                if file.startswith('.') or file in excluded_files:
+                if file.startswith('.') or file in EXCLUDED_FILES:
                     skipped_files.append(os.path.join(root, file))
                     continue
 
                 _, ext = os.path.splitext(file)
-                if ext.lower() in excluded_extensions:
+                if ext.lower() in EXCLUDED_EXTENSIONS:
                     skipped_files.append(os.path.join(root, file))
                     continue
 
@@ -192,10 +225,7 @@ def add_directory_to_conversation(directory_path: str, conversation_history):
 
                     normalized_path = normalize_path(full_path)
                     content = read_local_file(normalized_path)
-                    conversation_history.append({
-                        "role": "system",
-                        "content": f"Content of file '{normalized_path}':\n\n{content}"
-                    })
+                    conversation_history.pin(f"Content of file '{normalized_path}':\n\n{content}")
                     added_files.append(normalized_path)
                     total_files_processed += 1
 
@@ -215,17 +245,55 @@ def add_directory_to_conversation(directory_path: str, conversation_history):
                 console.print(f"  [#6b7280]... and {len(skipped_files) - 10} more[/#6b7280]")
         console.print()
 
+FILE_MARKER_RE = re.compile(r"Content of file '([^']+)'")
+
+def files_in_context(conversation_history) -> set:
+    """Return the normalized paths whose full content already appears in the conversation."""
+    return {
+        path for msg in conversation_history
+        if isinstance(msg.get("content"), str)
+        for path in FILE_MARKER_RE.findall(msg["content"])
+    }
+
 def ensure_file_in_context(file_path: str, conversation_history) -> bool:
     try:
         normalized_path = normalize_path(file_path)
         content = read_local_file(normalized_path)
         file_marker = f"Content of file '{normalized_path}'"
         if not any((isinstance(msg.get("content"), str) and file_marker in msg["content"]) for msg in conversation_history):
-            conversation_history.append({
-                "role": "system",
-                "content": f"{file_marker}:\n\n{content}"
-            })
+            conversation_history.pin(f"{file_marker}:\n\n{content}")
         return True
     except OSError:
         console.print(f"[bold #ef4444]✗[/bold #ef4444] Could not read file '[#f472b6]{file_path}[/#f472b6]' for editing context")
         return False
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for context budgets."""
+    return len(text) // 4 + 1
+
+def iter_workspace_files(directory_path: str, max_files: int = 1000, max_file_size: int = 5_000_000,
+                         check_binary: bool = True):
+    """Yield normalized paths of readable text files under 'directory_path', skipping excluded entries.
+
+    With check_binary=False files are not opened, so callers that cache per-file results can
+    run is_binary_file only on files that are new or changed.
+    """
+    yielded = 0
+    for root, dirs, files in os.walk(directory_path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in EXCLUDED_FILES)
+        for file in sorted(files):
+            if yielded >= max_files:
+                return
+            if file.startswith('.') or file in EXCLUDED_FILES:
+                continue
+            _, ext = os.path.splitext(file)
+            if ext.lower() in EXCLUDED_EXTENSIONS:
+                continue
+            full_path = os.path.join(root, file)
+            try:
+                if os.path.getsize(full_path) > max_file_size or (check_binary and is_binary_file(full_path)):
+                    continue
+                yield normalize_path(full_path)
+                yielded += 1
+            except (OSError, ValueError):
+                continue
@@ -0,0 +1,179 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from src.core.config import console, PREFETCH_ENABLED, PREFETCH_TOKEN_BUDGET
+from src.utils.file_operations import (
+    read_local_file, normalize_path, is_binary_file, estimate_tokens, files_in_context,
+    iter_workspace_files
+)
+
+# --------------------------------------------------------------------------------
+# Speculative Prefetch
+# --------------------------------------------------------------------------------
+
+# "src/api/handler.py", "./main.py", "README.md"
+PATH_RE = re.compile(r"(?<![\w/.-])((?:\.{0,2}/)?(?:[\w.-]+/)*[\w-]+\.[A-Za-z0-9]{1,8})(?![\w/-])")
+# "src.api.handler"
+MODULE_RE = re.compile(r"(?<![\w/.])([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)+)(?![\w/])")
+MAX_PREFETCH_FILE_SIZE = 200_000
+MAX_SCANNED_FILES = 20_000
+# How long a request waits for a file-name scan that is still running
+SCAN_WAIT_SECONDS = 2.0
+
+class PathPrefetcher:
+    """Reads files mentioned in the user's input in the background so they are ready when the request is built."""
+
+    def __init__(self, root: str = "."):
+        self.root = os.path.abspath(root)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._reads = {}  # path -> Future[(mtime, content)]
+        self._pending_text = None
+        self._warm_scheduled = False
+        self._basenames = {}  # file name -> [paths], for mentions like "handler.py"
+        self._scan = None
+        self.mentions = 0
+        self.hits = 0
+
+    def scan(self):
+        """Rebuild the file-name map in the background (at startup and after each turn)."""
+        if PREFETCH_ENABLED and (self._scan is None or self._scan.done()):
+            self._scan = self._executor.submit(self._scan_names)
+
+    def _scan_names(self):
+        basenames = {}
+        for path in iter_workspace_files(self.root, max_files=MAX_SCANNED_FILES, check_binary=False):
+            basenames.setdefault(os.path.basename(path), []).append(path)
+        self._basenames = basenames
+
+    def _lookup_basename(self, name: str):
+        matches = self._basenames.get(name, [])
+        return matches[0] if len(matches) == 1 else None
+
+    def _resolve(self, candidate: str):
+        try:
+            path = normalize_path(os.path.join(self.root, candidate))
+        except ValueError:
+            return None
+        if not path.startswith(self.root + os.sep):
+            return None
+        if os.path.isfile(path):
+            return path
+        if "/" not in candidate:
+            return self._lookup_basename(candidate)
+        return None
+
+    def candidates(self, text: str):
+        """Return (path-like mentions, mentions found in the workspace, resolved file paths) for 'text'."""
+        path_mentions = PATH_RE.findall(text)
+        mentions = [[match] for match in path_mentions]
+        for match in MODULE_RE.findall(text):
+            if match in path_mentions:
+                continue
+            module_path = match.replace(".", "/")
+            mentions.append([module_path + ".py", module_path + "/__init__.py"])
+
+        resolved = []
+        hits = 0
+        for group in mentions:
+            for candidate in group:
+                path = self._resolve(candidate)
+                if path:
+                    hits += 1
+                    if path not in resolved:
+                        resolved.append(path)
+                    break
+        return len(mentions), hits, resolved
+
+    def _read(self, path: str):
+        mtime = os.path.getmtime(path)
+        if os.path.getsize(path) > MAX_PREFETCH_FILE_SIZE or is_binary_file(path):
+            return mtime, None
+        return mtime, read_local_file(path)
+
+    def warm(self, text: str):
+        """Queue background reads for every file mentioned in 'text'.
+
+        Called on each keystroke, so it never touches disk itself: path resolution and reads run on
+        the prefetch threads, and only the latest text is resolved if typing outpaces them.
+        """
+        if not PREFETCH_ENABLED:
+            return
+        with self._lock:
+            self._pending_text = text
+            if self._warm_scheduled:
+                return
+            self._warm_scheduled = True
+        self._executor.submit(self._warm_pending)
+
+    def _warm_pending(self):
+        with self._lock:
+            text, self._pending_text = self._pending_text, None
+            self._warm_scheduled = False
+        for path in self.candidates(text)[2]:
+            with self._lock:
+                if path not in self._reads:
+                    self._reads[path] = self._executor.submit(self._read, path)
+
+    def _content(self, path: str):
+        future = self._reads.get(path)
+        if future is not None:
+            try:
+                mtime, content = future.result()
+                if mtime == os.path.getmtime(path):
+                    return content, True
+            except (OSError, UnicodeDecodeError):
+                pass
+        try:
+            future = self._executor.submit(self._read, path)
+            self._reads[path] = future
+            return future.result()[1], False
+        except (OSError, UnicodeDecodeError):
+            return None, False
+
+    def collect(self, user_message: str, conversation_history):
+        """Return (context block, attached paths) for files mentioned in 'user_message', within the token budget."""
+        if not PREFETCH_ENABLED:
+            return "", []
+        if self._scan is None:
+            self.scan()
+        try:
+            self._scan.result(timeout=SCAN_WAIT_SECONDS)
+        except FutureTimeoutError:
+            pass  # Bare file names just won't resolve this turn
+        mentions, hits, paths = self.candidates(user_message)
+        self.mentions += mentions
+        self.hits += hits
+        if not mentions:
+            return "", []
+
+        in_context = files_in_context(conversation_history)
+        blocks = []
+        attached = []
+        warm_hits = 0
+        used = 0
+        for path in paths:
+            if path in in_context:
+                continue
+            content, warm = self._content(path)
+            if content is None:
+                continue
+            block = f"Content of file '{path}':\n\n{content}"
+            cost = estimate_tokens(block)
+            if used + cost > PREFETCH_TOKEN_BUDGET:
+                continue
+            blocks.append(block)
+            attached.append(path)
+            warm_hits += warm
+            used += cost
+
+        console.print(
+            f"[dim]📥 Prefetch: {hits}/{mentions} mentioned path(s) found, {len(attached)} attached "
+            f"({warm_hits} read while typing); session hit rate {self.hits}/{self.mentions}[/dim]"
+        )
+        if not blocks:
+            return "", []
+        return "Files mentioned above (prefetched):\n\n" + "\n\n".join(blocks), attached
+
+prefetcher = PathPrefetcher()
@@ -0,0 +1,173 @@
+import ast
+import hashlib
+import os
+import re
+from src.core.config import console
+from src.utils.file_operations import (
+    read_local_file, iter_workspace_files, estimate_tokens
+)
+
+# --------------------------------------------------------------------------------
+# Repository Map
+# --------------------------------------------------------------------------------
+
+DEFAULT_MAP_TOKENS = 4000
+MAX_OUTLINE_LINES = 40
+
+# Definition lines worth keeping for non-Python sources (JS/TS, Go, Rust, ...)
+GENERIC_DEFINITION_RE = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:pub\s+)?(?:async\s+)?"
+    r"(?:function|class|interface|type|def|func|fn|struct|enum|trait|impl|module)\b"
+)
+MARKDOWN_HEADING_RE = re.compile(r"^#{1,3}\s+\S")
+
+# Outline cache keyed by path; entries are reused while the file hash is unchanged
+_outline_cache = {}
+
+def _first_doc_line(node) -> str:
+    doc = ast.get_docstring(node)
+    return doc.strip().splitlines()[0] if doc else ""
+
+def _format_function(node, indent: str) -> str:
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    signature = f"{indent}{prefix} {node.name}({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    doc = _first_doc_line(node)
+    return f"{signature}  # {doc}" if doc else signature
+
+def _outline_python(source: str):
+    """Return (outline lines, imported module names) for Python source."""
+    tree = ast.parse(source)
+    lines = []
+    imports = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines.append(_format_function(node, "  "))
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            header = f"  class {node.name}({bases})" if bases else f"  class {node.name}"
+            doc = _first_doc_line(node)
+            lines.append(f"{header}  # {doc}" if doc else header)
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    lines.append(_format_function(child, "    "))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.add(node.module)
+    return lines[:MAX_OUTLINE_LINES], imports
+
+def _outline_generic(file_path: str, source: str):
+    """Return definition-looking lines for non-Python sources."""
+    pattern = MARKDOWN_HEADING_RE if file_path.lower().endswith(".md") else GENERIC_DEFINITION_RE
+    lines = []
+    in_fence = False
+    for line in source.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+            continue
+        if not in_fence and pattern.match(line):
+            lines.append("  " + line.strip().rstrip("{").rstrip())
+            if len(lines) >= MAX_OUTLINE_LINES:
+                break
+    return lines, set()
+
+def outline_file(file_path: str):
+    """Return (outline lines, imports) for a file, cached by content hash."""
+    content = read_local_file(file_path)
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+    cached = _outline_cache.get(file_path)
+    if cached and cached[0] == digest:
+        return cached[1], cached[2]
+
+    lines, imports = [], set()
+    if file_path.endswith(".py"):
+        try:
+            lines, imports = _outline_python(content)
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            # Unparseable or too deeply nested for the parser: keep the definition-looking lines
+            lines, imports = _outline_generic(file_path, content)
+    else:
+        lines, imports = _outline_generic(file_path, content)
+
+    _outline_cache[file_path] = (digest, lines, imports)
+    return lines, imports
+
+def _module_names(rel_path: str):
+    """Names other files may use to import 'rel_path' (dotted path and bare stem)."""
+    stem = os.path.splitext(rel_path)[0].replace(os.sep, ".")
+    if stem.endswith(".__init__"):
+        stem = stem[:-len(".__init__")]
+    return {stem, stem.rsplit(".", 1)[-1]}
+
+def _render_tree(rel_paths, token_budget: int) -> str:
+    lines = []
+    seen_dirs = set()
+    for rel_path in rel_paths:
+        parts = rel_path.split(os.sep)
+        for depth in range(len(parts) - 1):
+            directory = os.sep.join(parts[:depth + 1])
+            if directory not in seen_dirs:
+                seen_dirs.add(directory)
+                lines.append(f"{'  ' * depth}{parts[depth]}/")
+        lines.append(f"{'  ' * (len(parts) - 1)}{parts[-1]}")
+
+    rendered = []
+    used = 0
+    for i, line in enumerate(lines):
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            rendered.append(f"... ({len(lines) - i} more entries)")
+            break
+        rendered.append(line)
+        used += cost
+    return "\n".join(rendered)
+
+def build_repo_map(directory_path: str, token_budget: int = DEFAULT_MAP_TOKENS) -> str:
+    """Build a ranked, token-budgeted outline of the files under 'directory_path'."""
+    outlines = {}
+    for file_path in iter_workspace_files(directory_path):
+        rel_path = os.path.relpath(file_path, directory_path)
+        try:
+            outlines[rel_path] = outline_file(file_path)
+        except (OSError, UnicodeDecodeError):
+            continue
+
+    # Rank files by how many other files import them, then by how much they define
+    import_counts = {rel_path: 0 for rel_path in outlines}
+    for rel_path in outlines:
+        names = _module_names(rel_path)
+        for other_path, (_, imports) in outlines.items():
+            if other_path != rel_path and any(
+                imported in names or imported.rsplit(".", 1)[-1] in names for imported in imports
+            ):
+                import_counts[rel_path] += 1
+    ranked = sorted(outlines, key=lambda p: (-import_counts[p], -len(outlines[p][0]), p))
+
+    tree = _render_tree(sorted(outlines), token_budget // 4)
+    sections = [f"Repository map of '{directory_path}' (outline only; use read_file for full bodies)", "", "File tree:", tree, "", "Outline:"]
+    used = estimate_tokens("\n".join(sections))
+    omitted = 0
+    for rel_path in ranked:
+        lines = outlines[rel_path][0]
+        if not lines:
+            continue
+        section = "\n".join([rel_path] + lines)
+        cost = estimate_tokens(section)
+        if used + cost > token_budget:
+            omitted += 1
+            continue
+        sections.append(section)
+        used += cost
+    if omitted:
+        sections.append(f"... {omitted} more file(s) omitted to stay within the {token_budget}-token budget")
+    return "\n".join(sections)
+
+def add_repo_map_to_conversation(directory_path: str, conversation_history, token_budget: int = DEFAULT_MAP_TOKENS):
+    """Add a compact repository map of 'directory_path' to the conversation context."""
+    with console.status("[bold bright_blue]🗺  Building repository map...[/bold bright_blue]"):
+        repo_map = build_repo_map(directory_path, token_budget)
+    conversation_history.pin(repo_map)
+    console.print(f"[bold #10b981]✓[/bold #10b981] Added map of '[#f472b6]{directory_path}[/#f472b6]' to conversation [#6b7280](~{estimate_tokens(repo_map)} tokens)[/#6b7280].\n")
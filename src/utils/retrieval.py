@@ -0,0 +1,332 @@
+import ast
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from src.core.config import (
+    console, RETRIEVAL_ENABLED, RETRIEVAL_TOP_K, RETRIEVAL_TOKEN_BUDGET
+)
+from src.utils.file_operations import (
+    read_local_file, iter_workspace_files, is_binary_file, estimate_tokens, files_in_context
+)
+
+# --------------------------------------------------------------------------------
+# BM25 Retrieval Index
+# --------------------------------------------------------------------------------
+
+INDEX_DIR = ".minicoder"
+INDEX_FILE = "bm25_index.sqlite"
+INDEX_VERSION = 2
+MAX_CHUNK_LINES = 60
+MAX_INDEXED_FILES = 20_000
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "are", "was",
+    "not", "but", "you", "can", "have", "has", "all", "any", "its", "our",
+    "self", "none", "true", "false", "return", "import", "def", "class",
+}
+
+def tokenize(text: str):
+    """Split text into lowercase terms, expanding snake_case and camelCase identifiers."""
+    terms = []
+    for word in TOKEN_RE.findall(text):
+        parts = [p for piece in word.split("_") for p in CAMEL_RE.findall(piece)]
+        for term in {word, *parts}:
+            term = term.lower()
+            if len(term) > 1 and term not in STOPWORDS:
+                terms.append(term)
+    return terms
+
+def _line_ranges(start: int, end: int):
+    """Yield (start, end) ranges no longer than MAX_CHUNK_LINES covering [start, end)."""
+    for chunk_start in range(start, end, MAX_CHUNK_LINES):
+        yield chunk_start, min(chunk_start + MAX_CHUNK_LINES, end)
+
+def chunk_source(file_path: str, content: str):
+    """Return (start, end) line ranges: top-level definitions for Python, paragraphs otherwise."""
+    lines = content.splitlines()
+    ranges = []
+    if file_path.endswith(".py"):
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            # Deeply nested or huge sources can exhaust the parser; fall back to paragraphs
+            tree = None
+        if tree is not None:
+            covered = 0
+            for node in tree.body:
+                start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+                end = node.end_lineno
+                if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    continue
+                if start > covered:
+                    ranges.extend(_line_ranges(covered, start))
+                ranges.extend(_line_ranges(start, end))
+                covered = end
+            if covered < len(lines):
+                ranges.extend(_line_ranges(covered, len(lines)))
+            return [r for r in ranges if any(lines[i].strip() for i in range(*r))]
+
+    # Paragraph chunking: small neighbouring paragraphs are merged into one chunk
+    start = None
+    for i, line in enumerate(lines + [""]):
+        if line.strip():
+            if start is None:
+                start = i
+        elif start is not None:
+            if ranges and i - ranges[-1][0] <= MAX_CHUNK_LINES // 2:
+                ranges[-1] = (ranges[-1][0], i)
+            else:
+                ranges.extend(_line_ranges(start, i))
+            start = None
+    return ranges
+
+class RetrievalIndex:
+    """Lexical BM25 index over workspace chunks, persisted per file in sqlite and patched incrementally.
+
+    refresh() touches disk and is meant to run on a background thread (see refresh_in_background);
+    search() only reads the in-memory postings, which refresh() patches for changed files only.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.index_path = os.path.join(self.root, INDEX_DIR, INDEX_FILE)
+        # path -> {"mtime", "size", "chunks": [[start, end, length, {term: tf}], ...]}
+        self.files = {}
+        self._postings = {}  # term -> {chunk_id: tf}
+        self._chunk_refs = {}  # chunk_id -> (file_path, start, end, length)
+        self._file_chunk_ids = {}  # file_path -> [chunk_id, ...]
+        self._next_chunk_id = 0
+        self._total_length = 0
+        self._loaded = False
+        self._lock = threading.Lock()  # guards the in-memory index
+        self._refresh_lock = threading.Lock()  # one refresh at a time
+        self._refresh_requested = False
+        self._refresh_running = False
+        self.ready = threading.Event()  # set once the first refresh has finished
+        self.last_error = None
+
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        connection = sqlite3.connect(self.index_path)
+        if connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            connection.execute("DROP TABLE IF EXISTS files")
+            connection.execute("PRAGMA user_version = %d" % INDEX_VERSION)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, chunks TEXT)"
+        )
+        return connection
+
+    def _load(self, connection):
+        loaded = {}
+        for path, mtime, size, chunks in connection.execute("SELECT path, mtime, size, chunks FROM files"):
+            try:
+                loaded[path] = {"mtime": mtime, "size": size, "chunks": json.loads(chunks)}
+            except ValueError:
+                continue
+        with self._lock:
+            for path, entry in loaded.items():
+                self._set_file(path, entry)
+        self._loaded = True
+
+    def _save(self, connection, updated, removed):
+        with connection:
+            connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+            connection.executemany(
+                "INSERT OR REPLACE INTO files (path, mtime, size, chunks) VALUES (?, ?, ?, ?)",
+                [(path, entry["mtime"], entry["size"], json.dumps(entry["chunks"])) for path, entry in updated.items()],
+            )
+
+
+    def _drop_file(self, file_path: str):
+        entry = self.files.pop(file_path, None)
+        for chunk_id, chunk in zip(self._file_chunk_ids.pop(file_path, []), entry["chunks"] if entry else []):
+            self._total_length -= self._chunk_refs.pop(chunk_id)[3]
+            for term in chunk[3]:
+                term_postings = self._postings[term]
+                del term_postings[chunk_id]
+                if not term_postings:
+                    del self._postings[term]
+
+    def _set_file(self, file_path: str, entry: dict):
+        self._drop_file(file_path)
+        self.files[file_path] = entry
+        chunk_ids = []
+        for start, end, length, tfs in entry["chunks"]:
+            chunk_id = self._next_chunk_id
+            self._next_chunk_id += 1
+            chunk_ids.append(chunk_id)
+            self._chunk_refs[chunk_id] = (file_path, start, end, length)
+            self._total_length += length
+            for term, tf in tfs.items():
+                self._postings.setdefault(term, {})[chunk_id] = tf
+        self._file_chunk_ids[file_path] = chunk_ids
+
+
+    def _index_file(self, file_path: str, stat) -> dict:
+        chunks = []
+        # Binary and undecodable files are kept with no chunks so they are not reopened on every scan
+        try:
+            content = None if is_binary_file(file_path) else read_local_file(file_path)
+        except UnicodeDecodeError:
+            content = None
+        if content is not None:
+            lines = content.splitlines()
+            for start, end in chunk_source(file_path, content):
+                terms = tokenize("\n".join(lines[start:end]))
+                if terms:
+                    chunks.append([start, end, len(terms), dict(Counter(terms))])
+        return {"mtime": stat.st_mtime, "size": stat.st_size, "chunks": chunks}
+
+    def refresh(self) -> int:
+        """Re-index new or modified files and drop deleted ones. Returns the number of files changed.
+
+        Unchanged files are only stat()ed; only changed files are read, patched into the postings
+        and rewritten in the on-disk index.
+        """
+        with self._refresh_lock:
+            connection = self._connect()
+            try:
+                if not self._loaded:
+                    self._load(connection)
+                updated = {}
+                seen = set()
+                for file_path in iter_workspace_files(self.root, max_files=MAX_INDEXED_FILES, check_binary=False):
+                    seen.add(file_path)
+                    try:
+                        stat = os.stat(file_path)
+                        entry = self.files.get(file_path)
+                        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                            continue
+                        updated[file_path] = self._index_file(file_path, stat)
+                    except OSError:
+                        seen.discard(file_path)
+                removed = set(self.files) - seen
+                if updated or removed:
+                    with self._lock:
+                        for file_path in removed:
+                            self._drop_file(file_path)
+                        for file_path, entry in updated.items():
+                            self._set_file(file_path, entry)
+                    self._save(connection, updated, removed)
+            finally:
+                connection.close()
+        self.ready.set()
+        return len(updated) + len(removed)
+
+    def refresh_in_background(self):
+        """Start refresh() on a daemon thread; a request made while one is running queues one more pass."""
+        with self._lock:
+            self._refresh_requested = True
+            if self._refresh_running:
+                return
+            self._refresh_running = True
+        threading.Thread(target=self._refresh_loop, name="retrieval-index", daemon=True).start()
+
+    def _refresh_loop(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._refresh_requested:
+                        self._refresh_running = False
+                        return
+                    self._refresh_requested = False
+                try:
+                    self.refresh()
+                    self.last_error = None
+                except (OSError, sqlite3.Error) as e:
+                    self.last_error = e
+        finally:
+            # An unexpected error must not leave the index looking busy for the rest of the session
+            with self._lock:
+                self._refresh_running = False
+
+    def search(self, query: str, top_k: int = 5):
+        """Return up to top_k (score, file_path, start, end) tuples ranked by BM25."""
+        with self._lock:
+            n_chunks = len(self._chunk_refs)
+            if not n_chunks:
+                return []
+            avg_length = self._total_length / n_chunks
+
+            scores = {}
+            for term in set(tokenize(query)):
+                term_postings = self._postings.get(term)
+                if not term_postings:
+                    continue
+                idf = math.log(1 + (n_chunks - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+                for chunk_id, tf in term_postings.items():
+                    length = self._chunk_refs[chunk_id][3]
+                    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * norm
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [(score, *self._chunk_refs[chunk_id][:3]) for chunk_id, score in best]
+
+    def relevant_snippets(self, query: str, top_k: int = 5, token_budget: int = 1500, skip_paths=()):
+        """Return formatted snippets for the best matches, stopping at the token budget."""
+        snippets = []
+        used = 0
+        for score, file_path, start, end in self.search(query, top_k):
+            if file_path in skip_paths:
+                continue
+            try:
+                lines = read_local_file(file_path).splitlines()[start:end]
+            except (OSError, UnicodeDecodeError):
+                continue
+            rel_path = os.path.relpath(file_path, self.root)
+            snippet = f"{rel_path} (lines {start + 1}-{end}):\n" + "\n".join(lines)
+            cost = estimate_tokens(snippet)
+            if used + cost > token_budget:
+                continue
+            snippets.append(snippet)
+            used += cost
+        return snippets
+
+_workspace_index = None
+
+def get_workspace_index(root: str = ".") -> RetrievalIndex:
+    """Return the shared index for the current workspace, creating it on first use."""
+    global _workspace_index
+    if _workspace_index is None or _workspace_index.root != os.path.abspath(root):
+        _workspace_index = RetrievalIndex(root)
+    return _workspace_index
+
+def refresh_workspace_index():
+    """Build or update the workspace index in the background (at startup and after each turn)."""
+    if RETRIEVAL_ENABLED:
+        get_workspace_index().refresh_in_background()
+
+def retrieve_relevant_snippets(user_message: str, conversation_history, skip_paths=()) -> str:
+    """Query the workspace index with 'user_message' and return a context block of the top snippets.
+
+    Never waits for the index: until the first background build has finished, retrieval is skipped.
+    """
+    if not RETRIEVAL_ENABLED:
+        return ""
+    index = get_workspace_index()
+    if index.last_error is not None:
+        console.print(f"[dim]Retrieval index refresh failed: {index.last_error}[/dim]")
+    if not index.ready.is_set():
+        index.refresh_in_background()
+        console.print("[dim]🔎 Workspace index is still being built; retrieval skipped for this message[/dim]")
+        return ""
+    in_context = files_in_context(conversation_history) | set(skip_paths)
+    snippets = index.relevant_snippets(
+        user_message, RETRIEVAL_TOP_K, RETRIEVAL_TOKEN_BUDGET, skip_paths=in_context
+    )
+    if not snippets:
+        return ""
+    console.print(f"[dim]📎 Attached {len(snippets)} workspace snippet(s)[/dim]")
+    return ("Possibly relevant workspace snippets (auto-retrieved; use read_file for full files):\n\n"
+            + "\n\n".join(snippets))
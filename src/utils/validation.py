@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# --------------------------------------------------------------------------------
+# Syntax Validation
+# --------------------------------------------------------------------------------
+
+FORMATS_BY_EXTENSION = {
+    ".py": "python", ".pyw": "python",
+    ".json": "json", ".ipynb": "json",
+    ".toml": "toml",
+    ".yaml": "yaml", ".yml": "yaml",
+}
+MAX_CACHE_ENTRIES = 256
+
+# (format, content hash) -> error list; a write that repeats checked content is not parsed again
+_validation_cache = OrderedDict()
+
+class SyntaxCheckError(ValueError):
+    """Raised when content about to be written does not parse."""
+
+def _line_excerpt(content: str, line: int) -> str:
+    lines = content.splitlines()
+    if 1 <= line <= len(lines):
+        return f"\n    {lines[line - 1].strip()}"
+    return ""
+
+def _check_python(path: str, content: str):
+    try:
+        compile(content, path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        line = e.lineno or 0
+        return [f"line {line}, column {e.offset or 0}: {e.msg}{_line_excerpt(content, line)}"]
+    except ValueError as e:  # e.g. null bytes
+        return [str(e)]
+    return []
+
+def _check_json(path: str, content: str):
+    try:
+        json.loads(content)
+    except json.JSONDecodeError as e:
+        return [f"line {e.lineno}, column {e.colno}: {e.msg}{_line_excerpt(content, e.lineno)}"]
+    return []
+
+def _check_toml(path: str, content: str):
+    if tomllib is None:
+        return []
+    try:
+        tomllib.loads(content)
+    except tomllib.TOMLDecodeError as e:
+        return [str(e)]
+    return []
+
+def _check_yaml(path: str, content: str):
+    if yaml is None:
+        return []
+    try:
+        for _ in yaml.safe_load_all(content):
+            pass
+    except yaml.YAMLError as e:
+        mark = getattr(e, "problem_mark", None)
+        if mark is not None:
+            problem = getattr(e, "problem", None) or str(e)
+            return [f"line {mark.line + 1}, column {mark.column + 1}: {problem}{_line_excerpt(content, mark.line + 1)}"]
+        return [str(e)]
+    return []
+
+CHECKERS = {
+    "python": _check_python,
+    "json": _check_json,
+    "toml": _check_toml,
+    "yaml": _check_yaml,
+}
+
+def syntax_errors(path: str, content: str):
+    """Parse 'content' in memory according to the extension of 'path' and return a list of errors."""
+    file_format = FORMATS_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+    if file_format is None:
+        return []
+    key = (file_format, hashlib.sha1(content.encode("utf-8", errors="surrogatepass")).hexdigest())
+    errors = _validation_cache.get(key)
+    if errors is None:
+        errors = CHECKERS[file_format](path, content)
+        _validation_cache[key] = errors
+        if len(_validation_cache) > MAX_CACHE_ENTRIES:
+            _validation_cache.popitem(last=False)
+    else:
+        _validation_cache.move_to_end(key)
+    return errors
+
+def format_errors(path: str, errors) -> str:
+    file_format = FORMATS_BY_EXTENSION[os.path.splitext(path)[1].lower()]
+    details = "\n".join(f"  {error}" for error in errors)
+    return f"{file_format} syntax check failed for '{path}':\n{details}"
+
+def has_syntax_check(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in FORMATS_BY_EXTENSION
+
+def validate_content(path: str, content: str, previous=None, previous_broken: bool = False):
+    """Raise SyntaxCheckError if 'content' does not parse.
+
+    When the file being replaced already failed to parse ('previous' has errors, or
+    'previous_broken' because it could not even be decoded), the write is allowed so a
+    broken file can be fixed step by step; the remaining errors are returned instead.
+    """
+    errors = syntax_errors(path, content)
+    if errors and not previous_broken and (previous is None or not syntax_errors(path, previous)):
+        raise SyntaxCheckError(format_errors(path, errors) + "\nThe file was not written.")
+    return errors
@@ -0,0 +1,16 @@
+from src.core.backends import create_backend
+
+def test_env_overrides_apply_with_prefix(monkeypatch):
+    monkeypatch.setenv("TEST_BASE_URL", "http://example:9000/v1")
+    monkeypatch.setenv("TEST_MODEL", "override")
+    monkeypatch.setenv("TEST_STREAM_USAGE", "1")
+    backend = create_backend("llamacpp", env_prefix="TEST_")
+    assert (backend.base_url, backend.model, backend.stream_usage) == ("http://example:9000/v1", "override", True)
+
+def test_presets_without_prefix_ignore_overrides(monkeypatch):
+    monkeypatch.setenv("MINICODER_BASE_URL", "http://example:9000/v1")
+    monkeypatch.setenv("MINICODER_MODEL", "override")
+    openai = create_backend("openai", env_prefix=None)
+    llamacpp = create_backend("llamacpp", env_prefix=None)
+    assert (openai.base_url, openai.model) == (None, "gpt-4o")
+    assert (llamacpp.base_url, llamacpp.model) == ("http://localhost:8080/v1", "local")
@@ -0,0 +1,113 @@
+import os
+import threading
+
+import pytest
+
+from src.utils import commands
+from src.utils.commands import RingBuffer, resolve_command, needs_confirmation, run_command
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "notes.txt").write_text("hello\n")
+    root = os.path.realpath(str(tmp_path))
+    monkeypatch.setattr(commands, "WORKSPACE_ROOT", root)
+    return root
+
+def test_ring_buffer_keeps_tail_and_total():
+    buffer = RingBuffer(8)
+    for chunk in (b"abcd", b"efgh", b"ijkl"):
+        buffer.write(chunk)
+    assert buffer.total == 12
+    assert buffer.tail() == "efghijkl"
+
+def test_ring_buffer_short_output_is_kept_whole():
+    buffer = RingBuffer(100)
+    buffer.write("héllo".encode("utf-8"))
+    assert buffer.tail() == "héllo"
+
+def test_resolve_command_splits_and_resolves_cwd(workspace):
+    argv, workdir = resolve_command("grep -n 'a b' notes.txt", "pkg")
+    assert argv == ["grep", "-n", "a b", "notes.txt"]
+    assert workdir == os.path.join(workspace, "pkg")
+
+def test_resolve_command_rejects_unknown_program(workspace):
+    with pytest.raises(ValueError, match="not an allowed command"):
+        resolve_command("curl http://example.com", ".")
+
+def test_resolve_command_rejects_cwd_outside_workspace(workspace):
+    with pytest.raises(ValueError, match="outside the workspace"):
+        resolve_command("ls", "..")
+    with pytest.raises(ValueError, match="does not exist"):
+        resolve_command("ls", "missing")
+
+def test_resolve_command_rejects_paths_outside_workspace(workspace):
+    outside = os.path.dirname(workspace)
+    for command in (
+        f"cat {outside}", "cat " + "../" * 20 + "etc/hostname", f"pytest --junitxml={outside}/report.xml",
+        f"grep -f{outside}/patterns -r .", f"grep -rf{outside}/patterns .", "grep -f" + "../" * 20 + "etc/hostname .",
+    ):
+        with pytest.raises(ValueError, match="outside the workspace"):
+            resolve_command(command, "pkg")
+    # Paths inside the workspace and patterns that only look like paths are fine
+    resolve_command(f"cat {workspace}/pkg/notes.txt", ".")
+    resolve_command("grep -r /no-such-dir/api/ .", ".")
+
+def test_resolve_command_accepts_symlinked_workspace(tmp_path, monkeypatch):
+    real = tmp_path / "real"
+    real.mkdir()
+    link = tmp_path / "link"
+    link.symlink_to(real)
+    monkeypatch.setattr(commands, "WORKSPACE_ROOT", os.path.realpath(str(link)))
+    assert resolve_command("ls", ".")[1] == str(real)
+
+def test_needs_confirmation():
+    assert not needs_confirmation(["pytest", "-q"])
+    assert not needs_confirmation(["git", "status"])
+    assert needs_confirmation(["git", "push", "--force"])
+    assert needs_confirmation(["git", "-c", "core.pager=sh", "log"])
+    assert needs_confirmation(["python", "-c", "print(1)"])
+
+def test_run_command_refuses_unconfirmed_commands(workspace):
+    assert "did not allow" in run_command("git reset --hard", ".")
+    assert "exit code 0" in run_command("cat notes.txt", "pkg")
+
+def test_git_options_that_run_programs_or_write_files_need_confirmation():
+    for argv in (
+        ["git", "grep", "--open-files-in-pager=rm", "hello"],
+        ["git", "grep", "-Orm", "hello"],
+        ["git", "grep", "-nO", "rm", "hello"],
+        ["git", "diff", "--output=pwned.txt", "HEAD"],
+        ["git", "diff", "--out=pwned.txt"],
+        ["git", "diff", "--ext-diff"],
+        ["git", "log", "--textconv", "-p"],
+    ):
+        assert needs_confirmation(argv), argv
+    for argv in (
+        ["git", "grep", "-n", "hello"],
+        ["git", "diff", "--stat", "--no-ext-diff"],
+        ["git", "log", "--oneline", "-p"],
+    ):
+        assert not needs_confirmation(argv), argv
+
+def test_time_limit_covers_queued_commands():
+    from src.core.config import COMMAND_WORKERS
+    from src.core.models import CommandsToRun
+    from src.tools.command_tools import run_command_time_limit
+
+    args = CommandsToRun(commands=["pytest"] * (COMMAND_WORKERS + 1), timeout=600)
+    assert run_command_time_limit(args) == 2 * 600 + 10
+
+def test_confirmation_is_asked_before_dispatch_on_calling_thread(workspace, monkeypatch):
+    from src.tools.definitions import registry
+
+    askers = []
+
+    def answer(prompt):
+        askers.append(threading.current_thread())
+        return "y"
+
+    monkeypatch.setattr(commands.console, "input", answer)
+    result = registry.dispatch("run_command", {"commands": ["python -c 'print(42)'", "ls"]}, None)
+    assert askers == [threading.current_thread()]
+    assert "42" in result and "exit code 0" in result
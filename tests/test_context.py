@@ -0,0 +1,114 @@
+import pytest
+
+from src.core import context
+from src.core.context import Conversation, PrefixCacheEstimator
+
+def _tool_turn(conversation, question, steps, answer, size=10):
+    conversation.append({"role": "user", "content": question})
+    for step in range(steps):
+        call_id = f"{question}-{step}"
+        conversation.append({"role": "assistant", "content": None, "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "read_file", "arguments": "{}"}}
+        ]})
+        conversation.append({"role": "tool", "tool_call_id": call_id, "content": "x" * size})
+    conversation.append({"role": "assistant", "content": answer})
+
+def _summary(conversation):
+    # Padding after "|" only adds tokens
+    return [f"{m['role']}:{m['content'].split('|')[0]}" for m in conversation if m["role"] in ("system", "user") or
+            (m["role"] == "assistant" and m.get("content"))]
+
+def _assert_tool_results_follow_calls(conversation):
+    open_calls = set()
+    for message in conversation:
+        if message["role"] == "assistant":
+            open_calls = {call["id"] for call in message.get("tool_calls", [])}
+        elif message["role"] == "tool":
+            assert message["tool_call_id"] in open_calls
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    monkeypatch.setattr(context, "TRIM_TRIGGER_TOKENS", 3000)
+    monkeypatch.setattr(context, "TRIM_KEEP_TOKENS", 1500)
+    monkeypatch.setattr(context, "TRIM_KEEP_TURNS", 3)
+
+def test_short_log_is_not_compacted(small_limits):
+    conversation = Conversation("sys")
+    conversation.pin("file A")
+    _tool_turn(conversation, "u1", 20, "final answer 1")
+    conversation.append({"role": "user", "content": "u2"})
+    before = list(conversation)
+    conversation.compact()
+    assert conversation == before
+
+def test_previous_turn_survives_compaction_after_long_tool_turn(small_limits):
+    conversation = Conversation("sys")
+    conversation.pin("file A")
+    _tool_turn(conversation, "u0", 5, "final answer 0", size=2500)
+    _tool_turn(conversation, "u1", 20, "final answer 1")
+    conversation.append({"role": "user", "content": "u2"})
+    conversation.compact()
+    assert _summary(conversation) == ["system:sys", "system:file A", "user:u1", "assistant:final answer 1", "user:u2"]
+    _assert_tool_results_follow_calls(conversation)
+
+def test_token_trigger_with_few_messages(small_limits):
+    conversation = Conversation("sys")
+    for i in range(4):
+        conversation.append({"role": "user", "content": f"u{i}|" + "y" * 4000})
+        conversation.append({"role": "assistant", "content": f"a{i}"})
+    conversation.append({"role": "user", "content": "u4"})
+    conversation.compact()
+    # 4000 estimated tokens trigger compaction; the last three turns don't fit in 1500, the last two do
+    assert _summary(conversation) == ["system:sys", "user:u3", "assistant:a3", "user:u4"]
+
+def test_long_single_turn_is_cut_at_an_assistant_message(small_limits):
+    conversation = Conversation("sys")
+    _tool_turn(conversation, "u1", 10, "final answer 1", size=1000)
+    conversation.compact()
+    assert conversation[1] == {"role": "user", "content": "u1"}
+    assert conversation[2]["role"] == "assistant"
+    assert len(conversation) < 22
+    _assert_tool_results_follow_calls(conversation)
+
+def test_late_pins_move_into_the_pinned_block(small_limits):
+    conversation = Conversation("sys")
+    conversation.append({"role": "user", "content": "u0|" + "y" * 16000})
+    conversation.pin("file B")
+    conversation.append({"role": "user", "content": "u1"})
+    conversation.compact()
+    assert _summary(conversation) == ["system:sys", "system:file B", "user:u1"]
+    assert conversation.pinned_end == 2
+
+def test_cache_estimator_reports_unchanged_prefix():
+    estimator = PrefixCacheEstimator()
+    messages = [{"role": "system", "content": "s" * 10000}, {"role": "user", "content": "a"}]
+    assert estimator.observe(messages, None)[0] == 0
+    unchanged, total = estimator.observe(messages + [{"role": "user", "content": "b"}], None)
+    assert 10000 < unchanged < total
+
+def test_pins_during_tool_calls_wait_for_the_results():
+    conversation = Conversation("sys")
+    conversation.append({"role": "user", "content": "u1"})
+    conversation.append({"role": "assistant", "content": None, "tool_calls": [
+        {"id": "c1", "type": "function", "function": {"name": "edit_file", "arguments": "{}"}}
+    ]})
+    conversation.pin("file A")
+    conversation.append({"role": "tool", "tool_call_id": "c1", "content": "ok"})
+    assert [m["role"] for m in conversation] == ["system", "user", "assistant", "tool"]
+
+    conversation.flush_pins()
+    assert [m["role"] for m in conversation] == ["system", "user", "assistant", "tool", "system"]
+    _assert_tool_results_follow_calls(conversation)
+
+def test_edit_file_does_not_pin_the_old_content(tmp_path):
+    from src.core.models import FileToEdit
+    from src.tools.file_tools import edit_file
+
+    path = tmp_path / "notes.txt"
+    path.write_text("old line\n")
+    conversation = Conversation("sys")
+    conversation.append({"role": "user", "content": "edit it"})
+    result = edit_file(FileToEdit(file_path=str(path), original_snippet="old", new_snippet="new"), conversation)
+    assert result.startswith("Successfully edited")
+    assert path.read_text() == "new line\n"
+    assert [m["role"] for m in conversation] == ["system", "user"]
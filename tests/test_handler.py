@@ -0,0 +1,197 @@
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src.api import handler
+from src.core.context import Conversation
+
+def _chunk(content, finish_reason=None):
+    delta = SimpleNamespace(content=content, tool_calls=None, reasoning_content=None)
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+def _tool_chunk(name, arguments, call_id="call_1", finish_reason="tool_calls"):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    delta = SimpleNamespace(content=None, reasoning_content=None,
+                            tool_calls=[SimpleNamespace(index=0, id=call_id, function=function)])
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+class FakeBackend:
+    name = "fake"
+    supports_tools = True
+    supports_reasoning = False
+
+    def __init__(self, replies):
+        self.requests = []
+        replies = iter(replies)
+
+        def create(**request):
+            self.requests.append({**request, "messages": list(request["messages"])})
+            return iter(next(replies))
+
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    @contextmanager
+    def slot(self):
+        yield
+
+    def request_options(self, max_tokens):
+        return {"model": "fake"}
+
+class RecordingEstimator:
+    def __init__(self):
+        self.observed = []
+
+    def observe(self, messages, tools):
+        self.observed.append(list(messages))
+        return 0, 1
+
+def test_continuations_are_not_observed_by_cache_estimator(monkeypatch):
+    estimator = RecordingEstimator()
+    monkeypatch.setattr(handler, "cache_estimator", estimator)
+    backend = FakeBackend([[_chunk("first half", "length")], [_chunk(" second half", "stop")]])
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "hi"}]
+
+    content, tool_calls, continuation_tokens = handler.request_completion(messages, backend)
+
+    assert content == "first half second half"
+    assert tool_calls == []
+    assert continuation_tokens > 0
+    assert len(backend.requests) == 2
+    assert estimator.observed == [messages]
+
+class NoPrefetch:
+    def collect(self, user_message, conversation_history):
+        return "", []
+
+    def scan(self):
+        pass
+
+@pytest.fixture
+def agent(monkeypatch, tmp_path):
+    """Run stream_openai_response without touching the workspace index or prefetcher."""
+    monkeypatch.setattr(handler, "prefetcher", NoPrefetch())
+    monkeypatch.setattr(handler, "retrieve_relevant_snippets", lambda *args, **kwargs: "")
+    monkeypatch.setattr(handler, "refresh_workspace_index", lambda: None)
+    path = tmp_path / "notes.txt"
+    path.write_text("hello")
+    return str(path)
+
+def _read_step(path, call_id):
+    return [_tool_chunk("read_file", json.dumps({"file_path": path}), call_id)]
+
+def test_agent_loop_runs_tools_until_a_terminal_answer(agent):
+    backend = FakeBackend([_read_step(agent, "c1"), _read_step(agent, "c2"), [_chunk("all done", "stop")]])
+    conversation = Conversation("sys")
+
+    result = handler.stream_openai_response("read it twice", conversation, backend)
+
+    assert result == {"success": True, "steps": 3, "stop_reason": None}
+    assert [m["role"] for m in conversation] == ["system", "user", "assistant", "tool", "assistant", "tool", "assistant"]
+    assert "hello" in conversation[3]["content"]
+    assert conversation[-1]["content"] == "all done"
+    # Each step sends the results of the previous one
+    assert [len(request["messages"]) for request in backend.requests] == [2, 4, 6]
+
+def test_agent_loop_stops_at_step_limit(agent, monkeypatch):
+    monkeypatch.setattr(handler, "AGENT_MAX_STEPS", 2)
+    backend = FakeBackend([_read_step(agent, f"c{i}") for i in range(5)])
+    result = handler.stream_openai_response("loop", Conversation("sys"), backend)
+    assert result["steps"] == 2 and result["stop_reason"] == "step limit (2)"
+    assert len(backend.requests) == 2
+
+def test_agent_loop_stops_at_token_budget(agent, monkeypatch):
+    monkeypatch.setattr(handler, "AGENT_MAX_TOKENS", 1)
+    backend = FakeBackend([_read_step(agent, f"c{i}") for i in range(5)])
+    result = handler.stream_openai_response("loop", Conversation("sys"), backend)
+    assert result["steps"] == 1 and result["stop_reason"].startswith("token budget")
+
+def test_agent_loop_stops_at_time_budget(agent, monkeypatch):
+    monkeypatch.setattr(handler, "AGENT_MAX_SECONDS", 0)
+    backend = FakeBackend([_read_step(agent, f"c{i}") for i in range(5)])
+    result = handler.stream_openai_response("loop", Conversation("sys"), backend)
+    assert result["steps"] == 1 and result["stop_reason"] == "time budget (0s)"
+
+def test_continuation_tokens_count_towards_the_budget(agent, monkeypatch):
+    monkeypatch.setattr(handler, "AGENT_MAX_TOKENS", 100_000)
+    real_request_completion = handler.request_completion
+
+    def costly_continuations(messages, model_backend=None):
+        content, tool_calls, continuation_tokens = real_request_completion(messages, model_backend)
+        assert continuation_tokens > 0
+        return content, tool_calls, 1_000_000
+
+    monkeypatch.setattr(handler, "request_completion", costly_continuations)
+    backend = FakeBackend([
+        [_tool_chunk("read_file", '{"file_path": ', "c1", finish_reason="length")],
+        [_chunk(json.dumps(agent) + "}", "stop")],
+        [_chunk("done", "stop")],
+    ])
+    conversation = Conversation("sys")
+    result = handler.stream_openai_response("read", conversation, backend)
+    assert result["steps"] == 1 and result["stop_reason"].startswith("token budget")
+    assert "hello" in conversation[3]["content"]
+
+def _create_file_call(arguments):
+    return {"id": "c1", "type": "function", "function": {"name": "create_file", "arguments": arguments}}
+
+def test_truncated_tool_arguments_are_stitched_back_together(tmp_path):
+    path = str(tmp_path / "hello.py")
+    full = json.dumps({"file_path": path, "content": "print('hello')\n"})
+    backend = FakeBackend([
+        [_tool_chunk("create_file", full[:30], finish_reason="length")],
+        [_chunk(full[30:], "stop")],
+    ])
+    content, tool_calls, _ = handler.request_completion([{"role": "user", "content": "write it"}], backend)
+    assert tool_calls[0]["function"]["arguments"] == full
+    # The continuation request carries the partial JSON and asks for the rest, without tools
+    continuation = backend.requests[1]
+    assert continuation["messages"][-2] == {"role": "assistant", "content": full[:30]}
+    assert "tools" not in continuation
+
+    result = handler.execute_function_call_dict(tool_calls[0], Conversation("sys"))
+    assert result == f"Successfully created file '{path}'"
+
+def test_continuation_in_a_code_fence_is_unwrapped(tmp_path):
+    full = json.dumps({"file_path": str(tmp_path / "a.txt"), "content": "text"})
+    backend = FakeBackend([
+        [_tool_chunk("create_file", full[:25], finish_reason="length")],
+        [_chunk("```json\n" + full[25:] + "\n```\n", "stop")],
+    ])
+    _, tool_calls, _ = handler.request_completion([{"role": "user", "content": "write it"}], backend)
+    assert json.loads(tool_calls[0]["function"]["arguments"]) == json.loads(full)
+
+def test_strip_code_fence():
+    assert handler._strip_code_fence('```\n"rest"}\n```') == '"rest"}'
+    assert handler._strip_code_fence('"rest"}') == '"rest"}'
+
+def test_still_truncated_create_file_asks_for_a_chunked_write():
+    result = handler.execute_function_call_dict(_create_file_call('{"file_path": "a.py", "content": "x = '), None)
+    assert result.startswith("Error parsing function arguments")
+    assert f"chunks of at most {handler.CHUNKED_WRITE_THRESHOLD} characters" in result
+    assert "mode 'append'" in result and "partial" in result
+
+    other = {"id": "c2", "type": "function", "function": {"name": "read_file", "arguments": "{"}}
+    assert "chunks" not in handler.execute_function_call_dict(other, None)
+
+def test_chunked_write_with_append_and_partial(tmp_path):
+    path = str(tmp_path / "module.py")
+
+    def write(**arguments):
+        return handler.execute_function_call_dict(_create_file_call(json.dumps(arguments)), Conversation("sys"))
+
+    # Partial chunks are not syntax-checked on their own; the last chunk checks the whole file
+    assert write(file_path=path, content="def f(:\n", partial=True).startswith("Successfully created")
+    assert write(file_path=path, content="    pass\n", mode="append", partial=True).startswith("Successfully appended")
+    with open(path) as f:
+        assert f.read() == "def f(:\n    pass\n"
+
+    path = str(tmp_path / "good.py")
+    write(file_path=path, content="def f(\n", partial=True)
+    assert write(file_path=path, content="):\n    pass\n", mode="append") == f"Successfully appended to file '{path}'"
+    assert "does not parse" not in write(file_path=path, content="x = 1\n", mode="append")
+    result = write(file_path=path, content="def (:\n", mode="append")
+    assert result.startswith("Error:") and "The file was not written" in result
+    with open(path) as f:
+        assert f.read() == "def f(\n):\n    pass\nx = 1\n"
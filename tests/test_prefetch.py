@@ -0,0 +1,37 @@
+import threading
+import time
+
+from src.utils import prefetch
+from src.utils.prefetch import PathPrefetcher
+
+def _workspace(tmp_path):
+    (tmp_path / "src" / "api").mkdir(parents=True)
+    (tmp_path / "src" / "api" / "handler.py").write_text("def handle():\n    pass\n")
+    return PathPrefetcher(str(tmp_path))
+
+def test_bare_file_name_resolves_on_first_turn(tmp_path):
+    prefetcher = _workspace(tmp_path)
+    block, paths = prefetcher.collect("look at handler.py", [])
+    assert paths == [str(tmp_path / "src" / "api" / "handler.py")]
+    assert "def handle()" in block
+    assert (prefetcher.hits, prefetcher.mentions) == (1, 1)
+
+def test_warm_does_not_touch_disk_on_calling_thread(tmp_path, monkeypatch):
+    prefetcher = _workspace(tmp_path)
+    prefetcher.scan()
+    callers = []
+    real_normalize = prefetch.normalize_path
+
+    def recording_normalize(path):
+        callers.append(threading.current_thread())
+        return real_normalize(path)
+
+    monkeypatch.setattr(prefetch, "normalize_path", recording_normalize)
+    prefetcher.warm("look at src/api/handler.py and handler.py")
+
+    path = str(tmp_path / "src" / "api" / "handler.py")
+    deadline = time.monotonic() + 5
+    while path not in prefetcher._reads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert prefetcher._reads[path].result(timeout=5)[1].startswith("def handle()")
+    assert callers and threading.current_thread() not in callers
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from pydantic import BaseModel
+
+from src.tools.registry import Tool, ToolRegistry
+
+# Handlers are looked up by "module:function"; isolated ones are imported again in a worker process
+MODULE = __name__
+
+class SleepArgs(BaseModel):
+    seconds: float = 0.0
+    text: str = ""
+
+release = threading.Event()
+
+def echo(args: SleepArgs, conversation_history) -> str:
+    time.sleep(args.seconds)
+    return f"echo {args.text}"
+
+def blocked_write(args: SleepArgs, conversation_history) -> str:
+    release.wait(10)
+    return "written"
+
+def _registry(**tools):
+    registry = ToolRegistry()
+    for name, options in tools.items():
+        registry.register(Tool(name=name, description=name, args_model=SleepArgs, **options))
+    return registry
+
+def test_schema_is_generated_from_model():
+    registry = _registry(echo={"handler": f"{MODULE}:echo"})
+    parameters = registry.schemas()[0]["function"]["parameters"]
+    assert set(parameters["properties"]) == {"seconds", "text"}
+    assert "title" not in parameters
+
+def test_invalid_arguments_are_reported():
+    registry = _registry(echo={"handler": f"{MODULE}:echo"})
+    assert registry.dispatch("echo", {"seconds": "soon"}, None).startswith("Error: invalid arguments for echo")
+    assert registry.dispatch("missing", {}, None) == "Unknown function: missing"
+
+def test_isolated_tool_runs_in_process_and_is_killed_on_timeout():
+    registry = _registry(echo={"handler": f"{MODULE}:echo", "isolated": True, "timeout": 5})
+    try:
+        assert registry.dispatch("echo", {"text": "hi"}, None) == "echo hi"
+        registry.get("echo").timeout = 0.5
+        result = registry.dispatch("echo", {"seconds": 30}, None)
+        assert result == "Error: echo timed out after 0.5s and was terminated"
+        assert registry._process_pool is None
+        registry.get("echo").timeout = 5
+        assert registry.dispatch("echo", {"text": "again"}, None) == "echo again"
+    finally:
+        registry.shutdown()
+
+def test_timed_out_write_blocks_further_writes_until_it_finishes():
+    release.clear()
+    registry = _registry(
+        write={"handler": f"{MODULE}:blocked_write", "timeout": 0.2},
+        read={"handler": f"{MODULE}:echo", "read_only": True},
+    )
+    try:
+        assert "timed out after 0.2s" in registry.dispatch("write", {}, None)
+        assert "was not run because an earlier write call timed out" in registry.dispatch("write", {}, None)
+        # Read-only tools are not blocked
+        assert registry.dispatch("read", {"text": "ok"}, None) == "echo ok"
+
+        release.set()
+        registry._unfinished_writes[0][1].result(timeout=5)
+        assert registry.dispatch("write", {}, None) == "written"
+    finally:
+        release.set()
+        registry.shutdown()
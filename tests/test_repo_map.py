@@ -0,0 +1,77 @@
+import os
+import textwrap
+
+from src.utils.repo_map import build_repo_map, outline_file
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(textwrap.dedent(content))
+
+def test_python_outline_lists_signatures_and_docstrings(tmp_path):
+    path = str(tmp_path / "shapes.py")
+    _write(path, '''\
+        import math
+        from collections import OrderedDict
+
+        def area(radius: float) -> float:
+            """Area of a circle.
+
+            More detail.
+            """
+            return math.pi * radius ** 2
+
+        class Square(Shape):
+            """A square."""
+
+            def __init__(self, side):
+                self.side = side
+
+            async def draw(self):
+                pass
+        ''')
+    lines, imports = outline_file(path)
+    assert lines == [
+        "  def area(radius: float) -> float  # Area of a circle.",
+        "  class Square(Shape)  # A square.",
+        "    def __init__(self, side)",
+        "    async def draw(self)",
+    ]
+    assert imports == {"math", "collections"}
+
+def test_markdown_outline_skips_code_fences(tmp_path):
+    path = str(tmp_path / "README.md")
+    _write(path, """\
+        # Title
+        text
+        ```bash
+        # not a heading
+        ```
+        ## Usage
+        """)
+    assert outline_file(path) == (["  # Title", "  ## Usage"], set())
+
+def test_unparseable_python_falls_back_to_generic_outline(tmp_path):
+    broken = str(tmp_path / "broken.py")
+    _write(broken, "def ok():\n    pass\ndef broken(:\n")
+    assert outline_file(broken)[0] == ["  def ok():", "  def broken(:"]
+
+    chained = str(tmp_path / "chained.py")
+    _write(chained, "def first():\n    pass\nx = " + " + ".join(['"a"'] * 20_000) + "\n")
+    assert outline_file(chained)[0] == ["  def first():"]
+
+def test_files_imported_by_others_are_ranked_first(tmp_path):
+    _write(str(tmp_path / "app.py"), "from core import helper\n\ndef main():\n    pass\n\ndef run():\n    pass\n")
+    _write(str(tmp_path / "cli.py"), "import core\n\ndef cli():\n    pass\n")
+    _write(str(tmp_path / "core.py"), "def helper():\n    pass\n")
+    repo_map = build_repo_map(str(tmp_path))
+    outline = repo_map.split("Outline:", 1)[1]
+    assert outline.index("core.py") < outline.index("app.py") < outline.index("cli.py")
+
+def test_map_stays_within_token_budget(tmp_path):
+    for i in range(30):
+        body = "\n".join(f"def function_{i}_{j}(argument_one, argument_two):\n    pass\n" for j in range(20))
+        _write(str(tmp_path / f"module_{i:02d}.py"), body)
+    repo_map = build_repo_map(str(tmp_path), token_budget=600)
+    assert len(repo_map) // 4 <= 600
+    assert "more file(s) omitted to stay within the 600-token budget" in repo_map
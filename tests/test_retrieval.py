@@ -0,0 +1,104 @@
+import os
+import textwrap
+
+import pytest
+
+from src.utils.retrieval import RetrievalIndex, chunk_source, tokenize, MAX_CHUNK_LINES
+
+def test_tokenize_splits_identifiers():
+    terms = tokenize("parseHTTPResponse read_local_file")
+    for term in ("parsehttpresponse", "parse", "http", "response", "read_local_file", "read", "local", "file"):
+        assert term in terms
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("return the x and self") == []
+
+def test_chunk_source_python_definitions():
+    source = textwrap.dedent("""\
+        import os
+
+        def first():
+            return 1
+
+        @decorator
+        class Second:
+            pass
+        """)
+    assert chunk_source("module.py", source) == [(0, 2), (2, 4), (5, 8)]
+
+def test_chunk_source_splits_long_definitions():
+    body = "\n".join(f"    x{i} = {i}" for i in range(MAX_CHUNK_LINES + 10))
+    ranges = chunk_source("long.py", "def long():\n" + body + "\n")
+    assert ranges == [(0, MAX_CHUNK_LINES), (MAX_CHUNK_LINES, MAX_CHUNK_LINES + 11)]
+
+def test_chunk_source_paragraphs_for_other_files():
+    text = "alpha\nbeta\n\ngamma\n" + "\n" * MAX_CHUNK_LINES + "delta\n"
+    assert chunk_source("notes.txt", text) == [(0, 4), (MAX_CHUNK_LINES + 4, MAX_CHUNK_LINES + 5)]
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+def test_bm25_ranks_matching_chunk_first(tmp_path):
+    _write(str(tmp_path / "payments.py"), "def charge_card(amount):\n    return gateway.charge(amount)\n")
+    _write(str(tmp_path / "users.py"), "def create_user(name):\n    return User(name)\n")
+    _write(str(tmp_path / "notes.md"), "The card gateway charges customers.\n")
+    index = RetrievalIndex(str(tmp_path))
+    assert index.refresh() == 3
+
+    results = index.search("charge card", top_k=3)
+    assert [os.path.basename(path) for _, path, _, _ in results] == ["payments.py", "notes.md"]
+    assert results[0][0] > results[1][0]
+
+def test_refresh_patches_only_changed_files(tmp_path):
+    _write(str(tmp_path / "a.py"), "def alpha():\n    pass\n")
+    _write(str(tmp_path / "b.py"), "def beta():\n    pass\n")
+    index = RetrievalIndex(str(tmp_path))
+    index.refresh()
+    assert index.ready.is_set()
+    assert index.refresh() == 0
+
+    _write(str(tmp_path / "a.py"), "def gamma():\n    pass\n")
+    os.remove(tmp_path / "b.py")
+    assert index.refresh() == 2
+    assert index.search("alpha") == []
+    assert index.search("beta") == []
+    assert os.path.basename(index.search("gamma")[0][1]) == "a.py"
+
+    # The on-disk index matches the patched in-memory one
+    reloaded = RetrievalIndex(str(tmp_path))
+    assert reloaded.refresh() == 0
+    assert os.path.basename(reloaded.search("gamma")[0][1]) == "a.py"
+
+def test_binary_files_are_not_reopened(tmp_path):
+    (tmp_path / "blob.dat").write_bytes(b"\0binary")
+    index = RetrievalIndex(str(tmp_path))
+    assert index.refresh() == 1
+    assert index.refresh() == 0
+
+DEEPLY_CHAINED = "x = " + " + ".join(['"a"'] * 20_000) + "\n"
+
+def test_chunk_source_falls_back_when_parser_recurses_too_deep():
+    assert chunk_source("chained.py", DEEPLY_CHAINED) == [(0, 1)]
+
+def test_background_refresh_survives_unparseable_files(tmp_path):
+    _write(str(tmp_path / "chained.py"), DEEPLY_CHAINED)
+    _write(str(tmp_path / "ok.py"), "def alpha():\n    pass\n")
+    index = RetrievalIndex(str(tmp_path))
+    index.refresh_in_background()
+    assert index.ready.wait(10)
+    assert os.path.basename(index.search("alpha")[0][1]) == "ok.py"
+
+def test_refresh_loop_resets_running_flag_on_unexpected_errors(tmp_path, monkeypatch):
+    index = RetrievalIndex(str(tmp_path))
+
+    def explode():
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(index, "refresh", explode)
+    index._refresh_requested = True
+    index._refresh_running = True
+    with pytest.raises(RuntimeError):
+        index._refresh_loop()
+    assert not index._refresh_running
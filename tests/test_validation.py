@@ -0,0 +1,91 @@
+import pytest
+
+from src.core.models import FileToCreate, FilesToCreate
+from src.tools.file_tools import write_multiple_files
+from src.utils import validation
+from src.utils.file_operations import create_file
+from src.utils.validation import syntax_errors, validate_content, SyntaxCheckError
+
+def test_python_errors_report_line_and_column():
+    errors = syntax_errors("module.py", "x = 1\ndef broken(:\n    pass\n")
+    assert len(errors) == 1
+    assert errors[0].startswith("line 2, column 12:")
+    assert "def broken(:" in errors[0]
+
+def test_json_errors_report_line_and_column():
+    errors = syntax_errors("data.json", '{\n  "a": 1,\n  "b": \n}\n')
+    assert errors[0].startswith("line 4, column 1:")
+
+def test_toml_errors_report_line_and_column():
+    errors = syntax_errors("config.toml", "[tool]\nname = \n")
+    assert "line 2" in errors[0] and "column" in errors[0]
+
+def test_yaml_errors_report_line_and_column():
+    if validation.yaml is None:
+        pytest.skip("PyYAML is not installed")
+    errors = syntax_errors("config.yaml", "a: 1\nb: [1, 2\nc: 3\n")
+    assert errors[0].startswith("line 3, column")
+
+def test_unchecked_extensions_always_pass():
+    assert syntax_errors("notes.txt", "def (:") == []
+
+def test_rejected_write_leaves_file_untouched(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("x = 1\n")
+    with pytest.raises(SyntaxCheckError, match="The file was not written"):
+        create_file(str(path), "def broken(:\n")
+    assert path.read_text() == "x = 1\n"
+
+    new_path = tmp_path / "new.json"
+    with pytest.raises(SyntaxCheckError):
+        create_file(str(new_path), "{")
+    assert not new_path.exists()
+
+def test_already_broken_file_can_be_fixed_step_by_step(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text("def a(:\n    pass\ndef b(:\n    pass\n")
+    remaining = create_file(str(path), "def a():\n    pass\ndef b(:\n    pass\n")
+    assert "line 3" in remaining
+    assert create_file(str(path), "def a():\n    pass\ndef b():\n    pass\n") == ""
+
+def test_create_multiple_files_can_fix_a_broken_file(tmp_path):
+    broken = tmp_path / "broken.json"
+    broken.write_text("{")
+    result = write_multiple_files(FilesToCreate(files=[
+        FileToCreate(path=str(broken), content='{"a": }'),
+        FileToCreate(path=str(tmp_path / "ok.json"), content="{}"),
+    ]), None)
+    assert result.startswith("Successfully created 2 files")
+    assert "still does not parse" in result
+    assert broken.read_text() == '{"a": }'
+
+def test_undecodable_or_unchecked_files_can_be_overwritten(tmp_path):
+    notes = tmp_path / "notes.txt"
+    notes.write_bytes("café".encode("latin-1"))
+    assert create_file(str(notes), "plain text") == ""
+    assert notes.read_text() == "plain text"
+
+    module = tmp_path / "legacy.py"
+    module.write_bytes("x = 'café'\n".encode("latin-1"))
+    create_file(str(module), "x = 'cafe'\n")
+    assert module.read_text() == "x = 'cafe'\n"
+
+def test_validate_content_allows_errors_when_previous_was_broken():
+    assert validate_content("a.json", "{", previous="[") == ["line 1, column 2: Expecting property name enclosed in double quotes\n    {"]
+    assert validate_content("a.json", "{", previous_broken=True)
+    with pytest.raises(SyntaxCheckError):
+        validate_content("a.json", "{", previous="[]")
+
+def test_repeated_content_is_served_from_cache(monkeypatch):
+    calls = []
+    real_check = validation.CHECKERS["json"]
+
+    def counting_check(path, content):
+        calls.append(content)
+        return real_check(path, content)
+
+    monkeypatch.setitem(validation.CHECKERS, "json", counting_check)
+    content = '{"cache": "test-%s"}' % id(calls)
+    assert syntax_errors("a.json", content) == []
+    assert syntax_errors("b.json", content) == []
+    assert calls == [content]